@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+USER_CACHE_TIMEOUT = getattr(settings, 'AUTH_USER_CACHE_TIMEOUT', 30)
+TOKEN_USER_CLAIMS = ('username', 'is_superuser', 'is_staff')
+
+
+def get_user_cache_key(user_id):
+    return f'auth:user:{user_id}'
+
+
+def get_cached_user(user_id):
+    key = get_user_cache_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = User.objects.filter(pk=user_id, is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        cache.set(key, user, USER_CACHE_TIMEOUT)
+    return user
+
+
+def add_user_claims(token, user):
+    for claim in TOKEN_USER_CLAIMS:
+        token[claim] = getattr(user, claim)
+    return token
+
+
+class ClaimsUser(TokenUser):
+
+    @cached_property
+    def user(self):
+        return get_cached_user(self.id)
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name == 'token':
+            raise AttributeError(name)
+        return getattr(self.user, name)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(
+                _('Token contained no recognizable user identification'))
+        user = ClaimsUser(validated_token)
+        if not all(claim in validated_token for claim in TOKEN_USER_CLAIMS):
+            return user.user
+        return user
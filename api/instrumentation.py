@@ -0,0 +1,93 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger('api.performance')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics(object):
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - started
+
+
+@contextmanager
+def measure_serialization():
+    metrics = current_metrics.get()
+    if metrics is None or metrics.serializer_depth:
+        yield
+        return
+    metrics.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.serializer_time += time.perf_counter() - started
+        metrics.serializer_depth -= 1
+
+
+def to_ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+class PerformanceMiddleware(object):
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERFORMANCE_SAMPLE_RATE', 1.0)
+        self.slow_request_ms = getattr(
+            settings, 'PERFORMANCE_SLOW_REQUEST_MS', 500)
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        total_time = time.perf_counter() - started
+
+        slow = to_ms(total_time) >= self.slow_request_ms
+        sampled = random.random() < self.sample_rate
+        if sampled:
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={to_ms(metrics.db_time)};desc="{metrics.queries} queries"',
+                f'serializer;dur={to_ms(metrics.serializer_time)}',
+                f'total;dur={to_ms(total_time)}',
+            ])
+        if sampled or slow:
+            logger.log(logging.WARNING if slow else logging.INFO, json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'queries': metrics.queries,
+                'db_ms': to_ms(metrics.db_time),
+                'serializer_ms': to_ms(metrics.serializer_time),
+                'total_ms': to_ms(total_time),
+                'slow': slow,
+            }))
+        return response
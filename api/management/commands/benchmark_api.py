@@ -0,0 +1,246 @@
+import json
+import re
+import subprocess
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.urls import urlpatterns
+from instagram.db.pool import PooledDatabaseWrapperMixin, get_pool_metrics
+from posts.models import Post
+
+
+URL_PREFIX = '/api/'
+
+ROUTE_PARAMETER = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+            text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def get_sample_parameters():
+    posts = Post.objects.select_related('author').filter(
+        author__followers__isnull=False, author__following__isnull=False)
+    post = posts.order_by('-comments_count', '-likes_count').first()
+    if post is None:
+        raise CommandError('The database has no posts, run generate_dataset first')
+    user = post.author
+    parameters = {
+        'username': user.username,
+        'post_pk': post.pk,
+        'comment_pk': post.comments.values_list('pk', flat=True).first(),
+        'tag_name': post.tags.values_list('pk', flat=True).first(),
+        'liked_username': post.likes.values_list(
+            'liked_user__username', flat=True).first(),
+        'follower_username': user.followers.values_list(
+            'user__username', flat=True).first(),
+        'following_username': user.following.values_list(
+            'following_user__username', flat=True).first(),
+    }
+    return user, parameters
+
+
+def get_view_class(pattern):
+    callback = pattern.callback
+    return getattr(callback, 'view_class', None) or getattr(callback, 'cls', None)
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks every GET route in api/urls.py and the create and delete routes, and reports latency percentiles and query counts as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output')
+        parser.add_argument(
+            '--close-connections', action='store_true',
+            help='Close the database connection before every request, as '
+                 'Django does at the end of a request when CONN_MAX_AGE is 0')
+
+    def handle(self, *args, **options):
+        user, parameters = get_sample_parameters()
+        client = APIClient()
+        client.force_authenticate(user)
+        endpoints = {}
+        for pattern in urlpatterns:
+            view_class = get_view_class(pattern)
+            if view_class is None or not hasattr(view_class, 'get'):
+                continue
+            route = str(pattern.pattern)
+            url = self.build_url(route, parameters)
+            if url is None:
+                endpoints[route] = {'name': pattern.name,
+                                    'skipped': 'no sample data'}
+                continue
+            endpoints[route] = self.benchmark(
+                client, url, options['iterations'],
+                options['close_connections'])
+            endpoints[route].update(name=pattern.name)
+
+        report = json.dumps({
+            'commit': get_commit(),
+            'created': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'iterations': options['iterations'],
+            'close_connections': options['close_connections'],
+            'connections': self.benchmark_connections(options['iterations']),
+            'endpoints': endpoints,
+            'writes': self.benchmark_writes(
+                user, parameters, options['iterations'],
+                options['close_connections']),
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                output.write(report)
+        else:
+            self.stdout.write(report)
+
+    def build_url(self, route, parameters):
+        missing = False
+
+        def replace(match):
+            nonlocal missing
+            value = parameters.get(match.group(1))
+            if value is None:
+                missing = True
+                return ''
+            return str(value)
+
+        url = URL_PREFIX + ROUTE_PARAMETER.sub(replace, route)
+        if missing:
+            return None
+        try:
+            resolve(url)
+        except Resolver404:
+            return None
+        return url
+
+    def benchmark_connections(self, iterations):
+        database = connections[DEFAULT_DB_ALIAS]
+        pooled = isinstance(database, PooledDatabaseWrapperMixin)
+        connect = (database.create_connection if pooled
+                   else database.get_new_connection)
+        params = database.get_connection_params()
+        connects = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            connect(params).close()
+            connects.append(time.perf_counter() - started)
+        checkouts = []
+        for _ in range(iterations):
+            database.close()
+            started = time.perf_counter()
+            database.ensure_connection()
+            checkouts.append(time.perf_counter() - started)
+        connect_ms = percentile(connects, 0.50) * 1000
+        checkout_ms = percentile(checkouts, 0.50) * 1000
+        return {
+            'pooled': pooled,
+            'connect_p50_ms': round(connect_ms, 3),
+            'checkout_p50_ms': round(checkout_ms, 3),
+            'saved_per_request_ms': round(connect_ms - checkout_ms, 3),
+            'pool': get_pool_metrics().get(database.alias),
+        }
+
+    def get_write_scenarios(self, user, parameters):
+        post_pk = Post.objects.exclude(likes__liked_user=user).values_list(
+            'pk', flat=True).first()
+        following_username = User.objects.exclude(pk=user.pk).exclude(
+            followers__user=user).values_list('username', flat=True).first()
+        post_data = {'description': 'Benchmark post'}
+        if parameters['tag_name'] is not None:
+            post_data.update(tags=[parameters['tag_name']])
+        scenarios = {
+            'post': (f'{URL_PREFIX}posts/', post_data,
+                     lambda data: f'{URL_PREFIX}posts/{data["id"]}/'),
+        }
+        if post_pk is not None:
+            likes_url = f'{URL_PREFIX}posts/{post_pk}/likes/'
+            scenarios['like'] = (
+                likes_url, {}, lambda data: f'{likes_url}{user.username}/')
+        if following_username is not None:
+            followers_url = f'{URL_PREFIX}users/{following_username}/followers/'
+            scenarios['follow'] = (
+                followers_url, {}, lambda data: followers_url)
+        return scenarios
+
+    def benchmark_writes(self, user, parameters, iterations,
+                         close_connections=False):
+        # Every iteration creates an object and deletes it again, so the
+        # dataset is left as it was. LikeDetail only lets superusers remove
+        # likes, hence the flag on this in-memory copy of the user.
+        writer = User.objects.get(pk=user.pk)
+        writer.is_superuser = True
+        client = APIClient()
+        client.force_authenticate(writer)
+        scenarios = {}
+        for name, (url, data, get_delete_url) in self.get_write_scenarios(
+                user, parameters).items():
+            self.create_and_delete(client, url, data, get_delete_url)
+            creates, deletes, delete_urls = zip(*(
+                self.create_and_delete(
+                    client, url, data, get_delete_url, close_connections)
+                for _ in range(iterations)))
+            scenarios[name] = {
+                'create': self.summarize(url, creates),
+                'delete': self.summarize(delete_urls[-1], deletes),
+            }
+        return scenarios
+
+    def create_and_delete(self, client, url, data, get_delete_url,
+                          close_connections=False):
+        created = self.measure(
+            lambda: client.post(url, data, format='json'), close_connections)
+        if created[0].status_code != 201:
+            raise CommandError(
+                f'POST {url} returned {created[0].status_code}')
+        delete_url = get_delete_url(created[0].data)
+        deleted = self.measure(
+            lambda: client.delete(delete_url), close_connections)
+        if deleted[0].status_code != 200:
+            raise CommandError(
+                f'DELETE {delete_url} returned {deleted[0].status_code}')
+        return created, deleted, delete_url
+
+    def measure(self, request, close_connections=False):
+        if close_connections:
+            connection.close()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = request()
+            duration = time.perf_counter() - started
+        return response, duration, len(queries)
+
+    def summarize(self, url, measurements):
+        response, _, queries = measurements[-1]
+        durations = [duration for _, duration, _ in measurements]
+        return {
+            'url': url,
+            'status': response.status_code,
+            'queries': queries,
+            'p50_ms': round(percentile(durations, 0.50) * 1000, 3),
+            'p95_ms': round(percentile(durations, 0.95) * 1000, 3),
+            'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+        }
+
+    def benchmark(self, client, url, iterations, close_connections=False):
+        client.get(url)
+        return self.summarize(url, [
+            self.measure(lambda: client.get(url), close_connections)
+            for _ in range(iterations)])
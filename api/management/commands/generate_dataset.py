@@ -0,0 +1,146 @@
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from comments.models import Comment
+from posts.feed import fan_out_post
+from posts.management.commands.rebuild_post_counters import rebuild_post_counters
+from posts.models import Post, PostLike
+from search.management.commands.rebuild_search_index import rebuild_search_index
+from tags.management.commands.rebuild_tag_usage import rebuild_tag_usage
+from tags.models import Tag
+from users.management.commands.reconcile_follow_counts import reconcile_follow_counts
+from users.models import Profile, UserFollowing
+
+
+BATCH_SIZE = 1000
+
+
+def power_law(rng, mean, maximum):
+    return min(int((rng.paretovariate(2) - 1) * mean), maximum)
+
+
+class Command(BaseCommand):
+    help = 'Generates a synthetic dataset of users, follows, posts, tags, likes and comments'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--followers-per-user', type=int, default=20)
+        parser.add_argument('--posts-per-user', type=int, default=5)
+        parser.add_argument('--tags', type=int, default=500)
+        parser.add_argument('--tags-per-post', type=int, default=3)
+        parser.add_argument('--likes-per-post', type=int, default=10)
+        parser.add_argument('--comments-per-post', type=int, default=3)
+        parser.add_argument('--password', default='benchmark')
+        parser.add_argument('--prefix', default='bench_')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            self.create_followings(rng, user_ids, options)
+            tag_names = self.create_tags(options)
+            posts = self.create_posts(rng, user_ids, tag_names, options)
+            self.create_likes(rng, user_ids, posts, options)
+            self.create_comments(rng, user_ids, posts, options)
+            rebuild_post_counters()
+            reconcile_follow_counts()
+            rebuild_tag_usage()
+            rebuild_search_index()
+            for post in posts:
+                fan_out_post(post)
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(user_ids)} users, {len(posts)} posts '
+            f'and {len(tag_names)} tags'))
+
+    def create_users(self, options):
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        usernames = [f'{prefix}{index}' for index in range(options['users'])]
+        # Only the generated usernames are looked up, so a prefix shared
+        # with real accounts never pulls them into the dataset.
+        for start in range(0, len(usernames), BATCH_SIZE):
+            existing = User.objects.filter(
+                username__in=usernames[start:start + BATCH_SIZE]).first()
+            if existing is not None:
+                raise CommandError(
+                    f'User {existing.username} already exists, '
+                    f'choose another --prefix')
+        User.objects.bulk_create(
+            (User(username=username, first_name=f'First{index}',
+                  last_name=f'Last{index}', password=password)
+             for index, username in enumerate(usernames)),
+            batch_size=BATCH_SIZE)
+        user_ids = []
+        for start in range(0, len(usernames), BATCH_SIZE):
+            user_ids.extend(User.objects.filter(
+                username__in=usernames[start:start + BATCH_SIZE]).values_list(
+                'pk', flat=True))
+        Profile.objects.bulk_create(
+            (Profile(user_id=user_id) for user_id in user_ids),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+        return user_ids
+
+    def create_followings(self, rng, user_ids, options):
+        followings = []
+        for user_id in user_ids:
+            followers_number = power_law(
+                rng, options['followers_per_user'], len(user_ids) - 1)
+            for follower_id in rng.sample(user_ids, followers_number):
+                if follower_id != user_id:
+                    followings.append(UserFollowing(
+                        user_id=follower_id, following_user_id=user_id))
+        UserFollowing.objects.bulk_create(
+            followings, batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    def create_tags(self, options):
+        tag_names = [f'{options["prefix"]}tag{index}'
+                     for index in range(options['tags'])]
+        Tag.objects.bulk_create(
+            (Tag(name=name) for name in tag_names),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+        return tag_names
+
+    def create_posts(self, rng, user_ids, tag_names, options):
+        posts = [Post(id=uuid.uuid4(), author_id=user_id,
+                      description=f'Post {index} of user {user_id}')
+                 for user_id in user_ids
+                 for index in range(power_law(
+                     rng, options['posts_per_user'],
+                     10 * options['posts_per_user']))]
+        Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+        weights = [1 / (rank + 1) for rank in range(len(tag_names))]
+        post_tags = {(post.pk, tag_name)
+                     for post in posts
+                     for tag_name in rng.choices(
+                         tag_names, weights, k=options['tags_per_post'])}
+        Post.tags.through.objects.bulk_create(
+            (Post.tags.through(post_id=post_pk, tag_id=tag_name)
+             for post_pk, tag_name in post_tags),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+        return posts
+
+    def create_likes(self, rng, user_ids, posts, options):
+        likes = {(post.pk, user_id)
+                 for post in posts
+                 for user_id in rng.sample(user_ids, power_law(
+                     rng, options['likes_per_post'], len(user_ids)))}
+        PostLike.objects.bulk_create(
+            (PostLike(post_id=post_pk, liked_user_id=user_id)
+             for post_pk, user_id in likes),
+            batch_size=BATCH_SIZE, ignore_conflicts=True)
+
+    def create_comments(self, rng, user_ids, posts, options):
+        Comment.objects.bulk_create(
+            (Comment(post_id=post.pk, author_id=rng.choice(user_ids),
+                     text=f'Comment {index}')
+             for post in posts
+             for index in range(power_law(
+                 rng, options['comments_per_post'],
+                 50 * options['comments_per_post']))),
+            batch_size=BATCH_SIZE)
@@ -1,3 +1,6 @@
+from api.instrumentation import measure_serialization
+
+
 class CustomPaginationMixin(object):
 
     @property
@@ -18,3 +21,11 @@ class CustomPaginationMixin(object):
     def get_paginated_response(self, data):
         assert self.paginator is not None
         return self.paginator.get_paginated_response(data)
+
+
+class TimedSerializerMixin(object):
+
+    def to_representation(self, instance):
+        with measure_serialization():
+            return super(TimedSerializerMixin, self).to_representation(
+                instance)
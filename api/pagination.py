@@ -0,0 +1,176 @@
+import base64
+import binascii
+import json
+import uuid
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(LimitOffsetPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.ordering = getattr(view, 'ordering', ('-pk',))
+        queryset = queryset.order_by(*self.ordering)
+        self.use_offset = (self.cursor_query_param not in request.query_params
+                           and self.offset_query_param in request.query_params)
+        if self.use_offset:
+            return super().paginate_queryset(queryset, request, view)
+
+        self.limit = self.get_limit(request)
+        self.request = request
+        position, self.reverse = self.decode_cursor(request)
+        if position is not None:
+            if self.reverse:
+                queryset = queryset.reverse()
+            try:
+                queryset = queryset.filter(
+                    self.get_keyset_filter(position, self.reverse))
+            except (ValidationError, TypeError, ValueError):
+                raise NotFound(self.invalid_cursor_message)
+        page = list(queryset[:self.limit + 1])
+        has_more = len(page) > self.limit
+        page = page[:self.limit]
+        if self.reverse:
+            page.reverse()
+        self.has_next = has_more or self.reverse
+        self.has_previous = has_more if self.reverse else position is not None
+        self.page = page
+        return page
+
+    def get_paginated_response(self, data):
+        if self.use_offset:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if self.use_offset:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if self.use_offset:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_keyset_filter(self, position, reverse):
+        keyset_filter = Q()
+        for index, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != reverse
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            equal = {previous.lstrip('-'): value for previous, value in zip(
+                self.ordering[:index], position[:index])}
+            keyset_filter |= Q(**equal, **{lookup: position[index]})
+        return keyset_filter
+
+    def encode_cursor(self, instance, reverse):
+        position = [getattr(instance, field.lstrip('-'))
+                    for field in self.ordering]
+        cursor = json.dumps([position, reverse], default=str)
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.offset_query_param)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            position, reverse = json.loads(
+                base64.urlsafe_b64decode(encoded.encode()).decode())
+        except (TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if (not isinstance(position, list)
+                or len(position) != len(self.ordering)
+                or not all(isinstance(value, (str, int, float))
+                           for value in position)):
+            raise NotFound(self.invalid_cursor_message)
+        return position, bool(reverse)
+
+
+class FeedPagination(LimitOffsetPagination):
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_feed(self, get_page, request):
+        self.limit = self.get_limit(request)
+        self.request = request
+        page = get_page(self.decode_cursor(request), self.limit + 1)
+        self.has_next = len(page) > self.limit
+        self.page = page[:self.limit]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        cursor = json.dumps([last.created.isoformat(), str(last.pk)])
+        encoded = base64.urlsafe_b64encode(cursor.encode()).decode()
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        return replace_query_param(url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            created, pk = json.loads(
+                base64.urlsafe_b64decode(encoded.encode()).decode())
+            position = parse_datetime(created), uuid.UUID(pk)
+        except (AttributeError, TypeError, ValueError, binascii.Error):
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+
+class SearchPagination(LimitOffsetPagination):
+
+    def paginate_results(self, get_page, request):
+        self.limit = self.get_limit(request)
+        self.offset = self.get_offset(request)
+        self.request = request
+        page = get_page(self.offset, self.limit + 1)
+        self.has_next = len(page) > self.limit
+        return page[:self.limit]
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.limit_query_param, self.limit)
+        offset = self.offset + self.limit
+        return replace_query_param(url, self.offset_query_param, offset)
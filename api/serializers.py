@@ -1,18 +1,39 @@
 from django.contrib.auth.models import User
-from django.forms.models import model_to_dict
+from django.db import transaction
+from django.db.models import Manager
 
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import RefreshToken
 
-from users.models import Profile, UserFollowing
+from users.models import FollowSuggestion, Profile, UserFollowing
+from users.revocation import is_revoked, revoke_token
 from posts.models import Post, PostLike
 from tags.models import Tag
 from comments.models import Comment
 
+from .authentication import add_user_claims
+from .mixins import TimedSerializerMixin
 from .utils import *
 from rest_framework import serializers
 
 
+def get_request_user(context):
+    request = context.get('request', None)
+    if request is None:
+        return None
+    return request.user
+
+
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         refresh = self.get_token(self.user)
@@ -24,35 +45,96 @@ class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class MyTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        refresh = RefreshToken(attrs['refresh'])
+        if is_revoked(refresh[jwt_settings.JTI_CLAIM]):
+            raise InvalidToken('Token is revoked')
+        data = super().validate(attrs)
+        if (jwt_settings.ROTATE_REFRESH_TOKENS
+                and jwt_settings.BLACKLIST_AFTER_ROTATION):
+            revoke_token(refresh)
+        return data
+
+
+class TokenRevokeSerializer(serializers.Serializer):
+    refresh = serializers.CharField()
+
+    def validate(self, attrs):
+        try:
+            attrs['refresh'] = RefreshToken(attrs['refresh'])
+        except TokenError as error:
+            raise InvalidToken(error.args[0])
+        return attrs
+
+    def save(self):
+        revoke_token(self.validated_data['refresh'])
+
+
 class ProfileSerializer(serializers.ModelSerializer):
     class Meta:
         model = Profile
         fields = ('description',)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        users = list(data.all() if isinstance(data, Manager) else data)
+        self.child.follow_flags = get_follow_flags(
+            get_request_user(self.context), users)
+        return super(UserListSerializer, self).to_representation(users)
+
+
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     profile = ProfileSerializer(required=True)
+    followers_count = serializers.IntegerField(
+        source='profile.followers_count', read_only=True)
+    following_count = serializers.IntegerField(
+        source='profile.following_count', read_only=True)
+    is_following = serializers.SerializerMethodField()
+    follows_you = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ('username', 'first_name', 'last_name',
-                  'email', 'profile', 'password')
+                  'email', 'profile', 'password', 'followers_count',
+                  'following_count', 'is_following', 'follows_you')
         extra_kwargs = {
             'password': {'write_only': True, },
             'profile': {'required': False, },
         }
+        list_serializer_class = UserListSerializer
 
     def create(self, validated_data):
         profile_data = validated_data.pop('profile')
         password = validated_data.pop('password')
-        user = User.objects.create(**validated_data)
+        user = User(**validated_data)
         user.set_password(password)
-        user.save()
-        profile = Profile.objects.get(user=user)
-        update_object(profile, **profile_data)
-        user.refresh_from_db()
+        user.profile = Profile(**profile_data)
+        with transaction.atomic():
+            user.save()
+            user.profile.save()
         return user
 
+    def get_flags(self, user):
+        if not hasattr(self, 'follow_flags'):
+            self.follow_flags = get_follow_flags(
+                get_request_user(self.context), [user])
+        return self.follow_flags
+
+    def get_is_following(self, user):
+        flags = self.get_flags(user)
+        if flags is None:
+            return None
+        return user.pk in flags[0]
+
+    def get_follows_you(self, user):
+        flags = self.get_flags(user)
+        if flags is None:
+            return None
+        return user.pk in flags[1]
+
 
 class DynamicFieldsModelSerializer(serializers.ModelSerializer):
     def __init__(self, *args, **kwargs):
@@ -67,7 +149,7 @@ class DynamicFieldsModelSerializer(serializers.ModelSerializer):
                 self.fields.pop(field_name)
 
 
-class UserFollowerSerializer(DynamicFieldsModelSerializer):
+class UserFollowerSerializer(TimedSerializerMixin, DynamicFieldsModelSerializer):
 
     class Meta:
         model = UserFollowing
@@ -75,26 +157,48 @@ class UserFollowerSerializer(DynamicFieldsModelSerializer):
 
     def to_representation(self, value):
         data = super(UserFollowerSerializer, self).to_representation(value)
-        user_id = data.get('user', None)
-        if user_id:
-            user = get_object_or_none(User, id=user_id)
-            if user:
-                data.update(user=user.username)
-        following_user_id = data.get('following_user', None)
-        if following_user_id:
-            following_user = get_object_or_none(User, id=following_user_id)
-            if following_user:
-                data.update(following_user=following_user.username)
+        if data.get('user', None):
+            data.update(user=value.user.username)
+        if data.get('following_user', None):
+            data.update(following_user=value.following_user.username)
         return data
 
 
-class TagSerializer(serializers.ModelSerializer):
+class FollowSuggestionSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    username = serializers.CharField(
+        source='suggested_user.username', read_only=True)
+
+    class Meta:
+        model = FollowSuggestion
+        fields = ('username', 'score')
+
+
+class MutualsSerializer(serializers.Serializer):
+    followed_by = serializers.ListField(child=serializers.CharField())
+    followed_by_count = serializers.IntegerField()
+    common_followers = serializers.ListField(child=serializers.CharField())
+    common_followers_count = serializers.IntegerField()
+
+
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = '__all__'
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class TagSuggestionSerializer(serializers.Serializer):
+    name = serializers.CharField()
+    posts_count = serializers.IntegerField()
+
+
+class TrendingTagSerializer(serializers.Serializer):
+    name = serializers.CharField(source='tag')
+    recent = serializers.IntegerField()
+    previous = serializers.IntegerField()
+    growth = serializers.IntegerField()
+
+
+class CommentSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Comment
         fields = '__all__'
@@ -102,44 +206,99 @@ class CommentSerializer(serializers.ModelSerializer):
 
     def to_representation(self, value):
         data = super(CommentSerializer, self).to_representation(value)
-        author_id = data.get('author', None)
-        if author_id:
-            author = get_object_or_none(User, id=author_id)
-            if author:
-                data.update(author=author.username)
+        if data.get('author', None):
+            data.update(author=value.author.username)
         return data
 
 
-class PostSerializer(serializers.ModelSerializer):
+class TagNamesField(serializers.ListField):
+    child = serializers.CharField(max_length=50)
+
+    def to_representation(self, tags):
+        return [tag.pk for tag in tags.all()]
+
+
+class PostListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        posts = list(data.all() if isinstance(data, Manager) else data)
+        self.child.viewer_flags = get_viewer_flags(
+            get_request_user(self.context), posts)
+        if self.child.includes_social_proof():
+            self.child.social_proof = get_social_proof(
+                get_request_user(self.context), posts)
+        return super(PostListSerializer, self).to_representation(posts)
+
+
+class PostSerializer(TimedSerializerMixin, serializers.ModelSerializer):
+    tags = TagNamesField(required=False)
+    viewer_has_liked = serializers.SerializerMethodField()
+    viewer_follows_author = serializers.SerializerMethodField()
+    liked_by_following = serializers.SerializerMethodField()
+
     class Meta:
         model = Post
         fields = ('id', 'author', 'description',
-                  'created', 'tags', 'comments', 'likes_number')
+                  'created', 'tags', 'comments', 'likes_number',
+                  'comments_number', 'viewer_has_liked',
+                  'viewer_follows_author', 'liked_by_following')
         extra_kwargs = {'comments': {'required': False}}
+        list_serializer_class = PostListSerializer
+
+    def create(self, validated_data):
+        create_not_existing_tags(validated_data.get('tags', []))
+        return super(PostSerializer, self).create(validated_data)
+
+    def update(self, instance, validated_data):
+        create_not_existing_tags(validated_data.get('tags', []))
+        return super(PostSerializer, self).update(instance, validated_data)
 
     def to_representation(self, value):
         data = super(PostSerializer, self).to_representation(value)
-        author_id = data.get('author', None)
-        author_username = get_username_from_id(author_id)
-        if author_username:
-            data.update(author=author_username)
-        comments_ids = data.get('comments', None)
-        if comments_ids:
-            comments = []
-            for comment_id in comments_ids:
-                comment = get_object_or_none(Comment, id=comment_id)
-                comment_dict = model_to_dict(comment)
-                comment_dict.pop('post')
-                author_id = comment_dict.get('author', None)
-                author_username = get_username_from_id(author_id)
-                if author_username:
-                    comment_dict.update(author=author_username)
-                comments.append(comment_dict)
+        data.update(author=value.author.username)
+        comments = [get_comment_dict(comment)
+                    for comment in value.comments.all()]
+        if comments:
             data.update(comments=comments)
         return data
 
+    def get_fields(self):
+        fields = super(PostSerializer, self).get_fields()
+        if not self.includes_social_proof():
+            fields.pop('liked_by_following')
+        return fields
+
+    def includes_social_proof(self):
+        request = self.context.get('request', None)
+        return (request is not None and request.user.is_authenticated
+                and request.query_params.get('social_proof') in ('1', 'true'))
+
+    def get_liked_by_following(self, post):
+        if not hasattr(self, 'social_proof'):
+            self.social_proof = get_social_proof(
+                get_request_user(self.context), [post])
+        return self.social_proof[post.pk]
+
+    def get_flags(self, post):
+        if not hasattr(self, 'viewer_flags'):
+            self.viewer_flags = get_viewer_flags(
+                get_request_user(self.context), [post])
+        return self.viewer_flags
+
+    def get_viewer_has_liked(self, post):
+        flags = self.get_flags(post)
+        if flags is None:
+            return None
+        return post.pk in flags[0]
+
+    def get_viewer_follows_author(self, post):
+        flags = self.get_flags(post)
+        if flags is None:
+            return None
+        return post.author_id in flags[1]
+
 
-class PostLikeSerializer(serializers.ModelSerializer):
+class PostLikeSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     username = serializers.CharField(
         source='liked_user.username', read_only=True)
 
@@ -0,0 +1,253 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from api.serializers import MyTokenObtainPairSerializer
+from api.urls import urlpatterns
+from comments.models import Comment
+from posts.models import Post, PostLike
+from tags.models import Tag
+from users.graph import load_follow_graph, reset_follow_graph
+from users.models import RevokedToken, UserFollowing
+from users.revocation import purge_revoked_tokens, reset_revocation_filter
+
+
+QUERY_BUDGETS = {
+    'get_routes': 0,
+    'get_users': 2,
+    'get_user': 3,
+    'get_user_followers': 2,
+    'get_user_follower': 1,
+    'get_user_followings': 2,
+    'get_user_following': 1,
+    'get_user_mutuals': 2,
+    'get_user_suggestions': 2,
+    'get_user_posts': 6,
+    'get_user_post': 5,
+    'get_user_post_tags': 2,
+    'get_user_post_tag': 1,
+    'get_user_post_comments': 2,
+    'get_user_post_comment': 1,
+    'get_user_post_likes': 2,
+    'get_posts': 5,
+    'get_post': 5,
+    'get_post_tags': 2,
+    'get_post_tag': 1,
+    'get_post_likes': 2,
+    'get_comments': 2,
+    'get_comment': 1,
+    'get_feed': 8,
+    'get_search': 7,
+    'get_tags': 1,
+    'get_trending_tags': 1,
+    'get_tag': 1,
+}
+
+QUERY_PARAMS = {
+    'get_search': {'q': 'text'},
+}
+
+
+def get_get_routes():
+    for pattern in urlpatterns:
+        callback = pattern.callback
+        view_class = getattr(callback, 'view_class', None) or getattr(
+            callback, 'cls', None)
+        if hasattr(view_class, 'get'):
+            yield pattern
+
+
+class QueryBudgetTestMixin(object):
+    fixture_size = None
+
+    @classmethod
+    def setUpTestData(cls):
+        size = cls.fixture_size
+        cls.author = User.objects.create(username='author')
+        users = [User.objects.create(username=f'user{index}')
+                 for index in range(size)]
+        tags = [Tag.objects.create(name=f'tag{index}') for index in range(size)]
+        for user in users:
+            UserFollowing.objects.create(user=user, following_user=cls.author)
+            UserFollowing.objects.create(user=cls.author, following_user=user)
+            Post.objects.create(author=user)
+        for index in range(size):
+            post = Post.objects.create(author=cls.author)
+            post.tags.set(tags)
+            for user in users:
+                Comment.objects.create(post=post, author=user, text='text')
+                PostLike.objects.create(post=post, liked_user=user)
+        cls.parameters = {
+            'username': 'author',
+            'follower_username': 'user0',
+            'following_username': 'user0',
+            'liked_username': 'user0',
+            'post_pk': post.pk,
+            'comment_pk': post.comments.first().pk,
+            'tag_name': 'tag0',
+            'other_username': 'user0',
+        }
+
+    def setUp(self):
+        reset_follow_graph()
+        load_follow_graph()
+        self.client.force_authenticate(self.author)
+
+    def tearDown(self):
+        reset_follow_graph()
+
+    def test_every_get_route_has_a_budget(self):
+        names = {pattern.name for pattern in get_get_routes()}
+        self.assertEqual(names - set(QUERY_BUDGETS), set())
+
+    def test_get_routes_stay_within_budget(self):
+        for pattern in get_get_routes():
+            kwargs = {name: self.parameters[name]
+                      for name in pattern.pattern.converters}
+            url = reverse(pattern.name, kwargs=kwargs)
+            with self.subTest(route=pattern.name, url=url):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.client.get(
+                        url, QUERY_PARAMS.get(pattern.name))
+                self.assertEqual(response.status_code, 200)
+                self.assertLessEqual(
+                    len(queries), QUERY_BUDGETS[pattern.name],
+                    '\n'.join(query['sql'] for query in queries))
+
+
+class SmallFixtureQueryBudgetTest(QueryBudgetTestMixin, APITestCase):
+    fixture_size = 1
+
+
+class LargeFixtureQueryBudgetTest(QueryBudgetTestMixin, APITestCase):
+    fixture_size = 15
+
+
+class PerformanceMiddlewareTest(APITestCase):
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_requests_are_not_timed(self):
+        response = self.client.get('/api/')
+        self.assertNotIn('Server-Timing', response)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1.0)
+    def test_sampled_requests_are_logged(self):
+        with self.assertLogs('api.performance', 'INFO') as logs:
+            response = self.client.get('/api/')
+        self.assertIn('Server-Timing', response)
+        self.assertIn('"path": "/api/"', logs.output[0])
+
+
+class StatelessAuthenticationTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='secret')
+        self.post = Post.objects.create(author=self.user, description='post')
+
+    def authenticate(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_token_carries_user_claims(self):
+        response = self.client.post('/api/users/token/',
+                                    {'username': 'user', 'password': 'secret'})
+        token = AccessToken(response.data['access'])
+        self.assertEqual((token['username'], token['is_superuser'],
+                          token['is_staff']), ('user', False, False))
+
+    def test_authenticated_requests_skip_the_user_query(self):
+        self.client.force_authenticate(self.user)
+        with CaptureQueriesContext(connection) as forced:
+            self.client.get(f'/api/posts/{self.post.pk}/')
+        self.client.force_authenticate(None)
+        self.authenticate(MyTokenObtainPairSerializer.get_token(
+            self.user).access_token)
+        with CaptureQueriesContext(connection) as stateless:
+            response = self.client.get(f'/api/posts/{self.post.pk}/')
+        self.assertEqual(response.data['viewer_has_liked'], False)
+        self.assertEqual(len(stateless), len(forced))
+
+    def test_permissions_compare_ids(self):
+        self.authenticate(MyTokenObtainPairSerializer.get_token(
+            self.user).access_token)
+        response = self.client.patch(f'/api/posts/{self.post.pk}/',
+                                     {'description': 'edited'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        other = User.objects.create(username='other')
+        self.authenticate(MyTokenObtainPairSerializer.get_token(
+            other).access_token)
+        response = self.client.patch(f'/api/posts/{self.post.pk}/',
+                                     {'description': 'stolen'}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+    def test_tokens_without_claims_load_the_user(self):
+        cache.clear()
+        self.authenticate(AccessToken.for_user(self.user))
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/')
+        self.assertEqual(response.status_code, 200)
+        with self.assertNumQueries(0):
+            self.client.get('/api/')
+
+
+class TokenRevocationTest(APITestCase):
+
+    def setUp(self):
+        reset_revocation_filter()
+        User.objects.create_user(username='user', password='secret')
+        response = self.client.post('/api/users/token/',
+                                    {'username': 'user', 'password': 'secret'})
+        self.refresh = response.data['refresh']
+
+    def tearDown(self):
+        reset_revocation_filter()
+
+    def refresh_token(self):
+        return self.client.post('/api/users/token/refresh/',
+                                {'refresh': self.refresh})
+
+    def test_valid_tokens_are_not_looked_up(self):
+        self.refresh_token()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.refresh_token()
+        self.assertEqual(response.status_code, 200)
+        revocation_queries = [query['sql'] for query in queries
+                              if 'users_revokedtoken' in query['sql']]
+        self.assertEqual(len(revocation_queries), 1)
+        self.assertIn('"id" >', revocation_queries[0])
+
+    def test_tokens_revoked_elsewhere_are_rejected(self):
+        self.refresh_token()
+        token = RefreshToken(self.refresh)
+        RevokedToken.objects.create(
+            jti=token['jti'], expires=timezone.now() + timedelta(days=1))
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_expired_revocations_are_purged(self):
+        RevokedToken.objects.create(jti='expired', expires=timezone.now())
+        RevokedToken.objects.create(
+            jti='active', expires=timezone.now() + timedelta(days=1))
+        self.assertEqual(purge_revoked_tokens(batch_size=1), 1)
+        self.assertEqual(list(RevokedToken.objects.values_list(
+            'jti', flat=True)), ['active'])
+
+    def test_revoked_tokens_cannot_be_refreshed(self):
+        self.refresh_token()
+        response = self.client.post('/api/users/token/revoke/',
+                                    {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh_token().status_code, 401)
+        reset_revocation_filter()
+        self.assertEqual(self.refresh_token().status_code, 401)
+
+    def test_revoking_an_invalid_token_fails(self):
+        response = self.client.post('/api/users/token/revoke/',
+                                    {'refresh': 'invalid'})
+        self.assertEqual(response.status_code, 401)
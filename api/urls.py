@@ -17,7 +17,10 @@ urlpatterns = [
 
     path('users/token/', views.MyTokenObtainPairView.as_view(),
          name='token_obtain_pair'),
-    path('users/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('users/token/refresh/', views.MyTokenRefreshView.as_view(),
+         name='token_refresh'),
+    path('users/token/revoke/', views.TokenRevokeView.as_view(),
+         name='token_revoke'),
 
     path('users/<str:username>/', views.UserDetail.as_view(), name='get_user'),
     path('users/<str:username>/followers/',
@@ -26,10 +29,15 @@ urlpatterns = [
          views.UserFollowerDetail.as_view(), name='get_user_follower'),
 
     path('users/<str:username>/following/',
-         views.UserFollowingList.as_view(), name='get_user_following'),
+         views.UserFollowingList.as_view(), name='get_user_followings'),
     path('users/<str:username>/following/<str:following_username>',
          views.UserFollowingDetail.as_view(), name='get_user_following'),
 
+    path('users/<str:username>/mutuals/<str:other_username>/',
+         views.UserMutualsDetail.as_view(), name='get_user_mutuals'),
+    path('users/<str:username>/suggestions/',
+         views.UserSuggestionsList.as_view(), name='get_user_suggestions'),
+
     path('users/<str:username>/posts/',
          views.PostsList.as_view(), name='get_user_posts'),
     path('users/<str:username>/posts/<uuid:post_pk>/',
@@ -69,6 +77,11 @@ urlpatterns = [
     path('posts/<uuid:post_pk>/comments/<str:comment_pk>/',
          views.CommentDetail.as_view(), name='get_comment'),
 
+    path('feed/', views.FeedList.as_view(), name='get_feed'),
+    path('search/', views.SearchList.as_view(), name='get_search'),
+
     path('tags/', views.TagsList.as_view(), name='get_tags'),
-    path('tags/<uuid:tag_name>/', views.TagDetail.as_view(), name='get_tag'),
+    path('tags/trending/', views.TrendingTagsList.as_view(),
+         name='get_trending_tags'),
+    path('tags/<str:tag_name>/', views.TagDetail.as_view(), name='get_tag'),
 ]
@@ -1,20 +1,46 @@
 from tags.models import Tag
 
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import (
+    Count, F, IntegerField, Max, OuterRef, Prefetch, Q, Subquery, Sum)
+from django.db.models.functions import Coalesce
 from django.forms.models import model_to_dict
 from django.shortcuts import get_list_or_404, get_object_or_404
 from django.core.exceptions import ValidationError
 from django.http import Http404
 
 
-from users.models import User, UserFollowing
-from posts.models import Post
-from tags.models import Tag
+from users.graph import get_follow_graph
+from users.models import FollowSuggestion, User, UserFollowing
+from posts.feed import assemble_feed
+from posts.models import Post, PostLike
+from tags.index import MAX_SUGGESTIONS, tag_index
+from tags.models import Tag, TagUsage
+from tags.usage import get_bucket
 from comments.models import Comment
+from search.models import Posting
+from search.tokens import tokenize
+
+
+LAST_PREFIX_CHARACTER = chr(0xffff)
+SEARCH_MAX_CANDIDATES = getattr(settings, 'SEARCH_MAX_CANDIDATES', 1000)
 
 
 def create_not_existing_tags(tags):
-    for tag in tags:
-        Tag.objects.get_or_create(name=tag)
+    names = list(dict.fromkeys(tags))
+    new_tags = [Tag(name=name) for name in names]
+    Tag.objects.bulk_create(new_tags, ignore_conflicts=True)
+    tag_index.add(names)
+
+
+def get_bounded_query_param(request, name, default, maximum):
+    try:
+        value = int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+    return min(max(value, 1), maximum)
 
 
 def get_object_or_none(model, **kwargs):
@@ -35,6 +61,12 @@ def get_username_from_id(id):
     return None
 
 
+def get_comment_dict(comment):
+    comment_dict = model_to_dict(comment, exclude=('post',))
+    comment_dict.update(author=comment.author.username)
+    return comment_dict
+
+
 def update_object(object, **kwargs):
     for key, value in kwargs.items():
         setattr(object, key, value)
@@ -46,13 +78,21 @@ def make_dict_from_names(names):
 
 
 def get_tags_from_dicts(dicts):
-    for name_dict in dicts:
-        tag, _ = Tag.objects.get_or_create(**name_dict)
-        yield tag
+    names = [name_dict['name'] for name_dict in dicts]
+    create_not_existing_tags(names)
+    return Tag.objects.filter(name__in=names)
+
 
+def starts_with(field, prefix):
+    return Q(**{f'{field}__gte': prefix,
+                f'{field}__lt': prefix + LAST_PREFIX_CHARACTER})
 
-def get_users():
-    users = User.objects.all()
+
+def get_users(query=None):
+    users = User.objects.select_related('profile')
+    if query:
+        users = users.filter(starts_with('username', query)
+                             | starts_with('first_name', query))
     return users
 
 
@@ -60,30 +100,141 @@ def get_user(username):
     return get_object_or_404(User, username=username)
 
 
-def get_posts(username=None):
+def with_post_relations(posts):
+    comments = Comment.objects.select_related('author')
+    return posts.select_related('author').prefetch_related(
+        'tags', Prefetch('comments', queryset=comments))
+
+
+def get_posts(username=None, related=False):
     if username:
         user = get_user(username)
         posts = Post.objects.filter(author=user)
     else:
         posts = Post.objects.all()
+    if related:
+        posts = with_post_relations(posts)
     return posts
 
 
-def get_post(post_pk, username=None):
-    posts = get_posts(username)
-    post = get_object_or_404(posts, pk=post_pk)
+def filter_by_author(username, prefix=''):
+    if username:
+        return {f'{prefix}author__username': username}
+    return {}
+
+
+def get_post(post_pk, username=None, related=False):
+    posts = Post.objects.select_related('author')
+    if related:
+        posts = with_post_relations(posts)
+    post = get_object_or_404(posts, pk=post_pk, **filter_by_author(username))
     return post
 
 
+def get_feed_posts(user, position, limit):
+    post_pks = assemble_feed(user.pk, limit, position)
+    posts = with_post_relations(Post.objects.all()).in_bulk(post_pks)
+    return [posts[post_pk] for post_pk in post_pks if post_pk in posts]
+
+
+def get_search_candidates(terms):
+    # Only the newest postings of the rarest term are scored, so a query
+    # costs the same however many posts match it.
+    postings = {term: Posting.objects.filter(term=term) for term in terms}
+    rarest = terms[0]
+    if len(terms) > 1:
+        rarest = min(terms, key=lambda term: postings[term][
+            :SEARCH_MAX_CANDIDATES + 1].count())
+    return list(postings[rarest].order_by('-created').values_list(
+        'post', flat=True)[:SEARCH_MAX_CANDIDATES])
+
+
+def search_posts(query, offset, limit):
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return []
+    matches = Posting.objects.filter(
+        term__in=terms, post__in=set(get_search_candidates(terms))).values(
+        'post').annotate(
+        matched=Count('term', distinct=True), score=Sum('weight'),
+        created=Max('created'),
+    ).filter(matched=len(terms)).order_by('-score', '-created', '-post')
+    post_pks = [match['post'] for match in matches[offset:offset + limit]]
+    posts = with_post_relations(Post.objects.all()).in_bulk(post_pks)
+    return [posts[post_pk] for post_pk in post_pks if post_pk in posts]
+
+
+def get_viewer_flags(viewer, posts):
+    if viewer is None or not viewer.is_authenticated:
+        return None
+    if not posts:
+        return set(), set()
+    liked_post_pks = set(PostLike.objects.filter(
+        liked_user=viewer.pk, post__in=[post.pk for post in posts]).values_list(
+        'post', flat=True))
+    followed_author_ids = set(UserFollowing.objects.filter(
+        user=viewer.pk,
+        following_user__in={post.author_id for post in posts}).values_list(
+        'following_user', flat=True))
+    return liked_post_pks, followed_author_ids
+
+
+def get_follow_flags(viewer, users):
+    # The viewer's own edges come from the database, so a follow made on
+    # another worker shows up at once whatever that worker's graph holds.
+    if viewer is None or not viewer.is_authenticated:
+        return None
+    user_pks = [user.pk for user in users]
+    if not user_pks:
+        return set(), set()
+    edges = UserFollowing.objects.filter(
+        Q(user=viewer.pk, following_user__in=user_pks)
+        | Q(user__in=user_pks, following_user=viewer.pk)).values_list(
+        'user', 'following_user')
+    following_ids = {following_user for user, following_user in edges
+                     if user == viewer.pk}
+    follower_ids = {user for user, following_user in edges
+                    if following_user == viewer.pk}
+    return following_ids, follower_ids
+
+
+def get_social_proof(viewer, posts, limit=3):
+    # One row per post: the count and the first `limit` usernames are
+    # subqueries, so popular posts never send every like over the wire.
+    social_proof = {post.pk: {'usernames': [], 'count': 0} for post in posts}
+    if not posts:
+        return social_proof
+    likes = PostLike.objects.filter(
+        post=OuterRef('pk'), liked_user__followers__user=viewer.pk)
+    count = likes.order_by().values('post').annotate(
+        count=Count('pk')).values('count')
+    usernames = likes.order_by('-create', '-id').values(
+        'liked_user__username')
+    username_fields = [f'liked_by_{index}' for index in range(limit)]
+    rows = Post.objects.filter(pk__in=list(social_proof)).annotate(
+        liked_by_count=Subquery(count, output_field=IntegerField()),
+        **{field: Subquery(usernames[index:index + 1])
+           for index, field in enumerate(username_fields)},
+    ).filter(liked_by_count__gt=0).values_list(
+        'pk', 'liked_by_count', *username_fields)
+    for post_pk, count, *names in rows:
+        social_proof[post_pk] = {
+            'usernames': [name for name in names if name is not None],
+            'count': count,
+        }
+    return social_proof
+
+
 def get_comments(post_pk, username=None):
     post = get_post(post_pk, username)
-    comments = post.comments.all()
+    comments = post.comments.select_related('author')
     return comments
 
 
 def get_comment(comment_pk, post_pk, username=None):
-    comments = get_comments(post_pk, username)
-    comment = get_object_or_404(comments, pk=comment_pk)
+    comments = Comment.objects.select_related('author', 'post__author')
+    comment = get_object_or_404(comments, pk=comment_pk, post=post_pk,
+                                **filter_by_author(username, 'post__'))
     return comment
 
 
@@ -96,55 +247,127 @@ def get_tags(post_pk=None, username=None):
     return tags
 
 
+def search_tags(prefix, limit):
+    return [{'name': name, 'posts_count': posts_count}
+            for name, posts_count in tag_index.search(prefix, limit)]
+
+
+def get_trending_tags(hours, limit):
+    window_start = get_bucket() - timedelta(hours=hours - 1)
+    previous_start = window_start - timedelta(hours=hours)
+    trending_tags = TagUsage.objects.filter(
+        bucket__gte=previous_start).values('tag').annotate(
+        recent=Coalesce(Sum('count', filter=Q(bucket__gte=window_start)), 0),
+        previous=Coalesce(Sum('count', filter=Q(bucket__lt=window_start)), 0),
+    ).annotate(growth=F('recent') - F('previous')).filter(
+        recent__gt=0).order_by('-growth', '-recent', 'tag')
+    return trending_tags[:limit]
+
+
 def get_tag(tag_pk, post_pk=None, username=None):
-    tags = get_tags(post_pk, username)
+    tags = Tag.objects.all()
+    if post_pk:
+        tags = tags.filter(post=post_pk,
+                           **filter_by_author(username, 'post__'))
     tag = get_object_or_404(tags, pk=tag_pk)
     return tag
 
 
 def get_liked_user(liked_username, post_pk, post_author_username):
-    post = get_post(post_pk, username=post_author_username)
-    likes = post.likes.all()
-    liked_user = get_user(liked_username)
-    post_like = get_object_or_404(likes, liked_user=liked_user)
+    likes = PostLike.objects.select_related('liked_user', 'post__author')
+    post_like = get_object_or_404(
+        likes, post=post_pk, liked_user__username=liked_username,
+        **filter_by_author(post_author_username, 'post__'))
     return post_like
 
 
 def get_user_followers(username):
     user = get_user(username)
-    user_followers = user.followers.all()
+    user_followers = user.followers.select_related('user')
     return user_followers
 
 
 def get_user_follower(username, follower_username):
-    user_followers = get_user_followers(username)
-    followed_user = get_user(follower_username)
+    user_followers = UserFollowing.objects.select_related(
+        'user', 'following_user')
     user_follower = get_object_or_404(
-        user_followers, user=followed_user)
+        user_followers, following_user__username=username,
+        user__username=follower_username)
     return user_follower
 
 
 def get_user_followings(username):
     user = get_user(username)
-    user_followings = user.following.all()
+    user_followings = user.following.select_related('following_user')
     return user_followings
 
 
 def get_user_following(username, following_username):
-    user_followings = get_user_followings(username)
-    followed_user = get_user(following_username)
+    user_followings = UserFollowing.objects.select_related(
+        'user', 'following_user')
     user_following = get_object_or_404(
-        user_followings, following_user=followed_user)
+        user_followings, user__username=username,
+        following_user__username=following_username)
     return user_following
 
 
+def get_mutual_ids(user_id, other_id):
+    other_followers = UserFollowing.objects.filter(
+        following_user=other_id).values('user')
+    followed_by = UserFollowing.objects.filter(
+        user=user_id, following_user__in=other_followers).order_by(
+        'following_user').values_list('following_user', flat=True)
+    common_followers = UserFollowing.objects.filter(
+        following_user=user_id, user__in=other_followers).order_by(
+        'user').values_list('user', flat=True)
+    return list(followed_by), list(common_followers)
+
+
+def get_mutuals(username, other_username, limit):
+    users = dict(User.objects.filter(
+        username__in=[username, other_username]).values_list('username', 'pk'))
+    if username not in users or other_username not in users:
+        raise Http404
+    graph = get_follow_graph()
+    if graph is None:
+        followed_by, common_followers = get_mutual_ids(
+            users[username], users[other_username])
+    else:
+        followed_by = graph.get_followed_by(
+            users[username], users[other_username])
+        common_followers = graph.get_common_followers(
+            users[username], users[other_username])
+    usernames = dict(User.objects.filter(
+        pk__in=followed_by[:limit] + common_followers[:limit]).values_list(
+        'pk', 'username'))
+    return {
+        'followed_by': [usernames[pk] for pk in followed_by[:limit]
+                        if pk in usernames],
+        'followed_by_count': len(followed_by),
+        'common_followers': [usernames[pk] for pk in common_followers[:limit]
+                             if pk in usernames],
+        'common_followers_count': len(common_followers),
+    }
+
+
+def get_user_suggestions(username):
+    user = get_user(username)
+    suggestions = user.suggestions.select_related('suggested_user').exclude(
+        suggested_user__followers__user=user)
+    return suggestions
+
+
 def is_superuser(user):
     if user.is_superuser:
         return True
     return False
 
 
+def is_same_user(user, other):
+    return user.pk == other.pk
+
+
 def is_author_or_superuser(user, instance):
-    if instance.author == user:
+    if instance.author_id == user.pk:
         return True
     return is_superuser(user)
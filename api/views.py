@@ -1,13 +1,16 @@
+from functools import partial
+
 from rest_framework import status
 from rest_framework.serializers import Serializer
 from rest_framework.settings import api_settings
 from rest_framework.decorators import api_view
-from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
+from rest_framework.permissions import AllowAny, IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.exceptions import PermissionDenied
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from api.mixins import CustomPaginationMixin
+from api.pagination import FeedPagination, SearchPagination
 
 from .serializers import *
 from .utils import *
@@ -17,9 +20,11 @@ from .utils import *
 def get_routes(request):
     routes = [
         {'GET': '/api/users'},
+        {'GET': '/api/users?q='},
         {'POST': '/api/users'},
         {'POST': '/api/users/token/'},
         {'POST': '/api/users/token/refresh/'},
+        {'POST': '/api/users/token/revoke/'},
         {'GET': '/api/users/id'},
         {'PATCH': '/api/users/id'},
         {'DELETE': '/api/users/id'},
@@ -32,6 +37,8 @@ def get_routes(request):
         {'GET': '/api/users/id/followers/id'},
         {'DELETE': '/api/users/id/followers/id'},
         {'POST': '/api/users/id/followers'},
+        {'GET': '/api/users/id/suggestions'},
+        {'GET': '/api/users/id/mutuals/id'},
         {'GET': '/api/users/id/posts'},
         {'POST': '/api/users/id/posts'},
         {'GET': '/api/users/id/posts/id'},
@@ -47,6 +54,11 @@ def get_routes(request):
         {'DELETE': '/api/users/id/posts/id/likes/id'},
         {'GET': '/api/users/id/posts/id/tags'},
         {'GET': '/api/users/id/posts/id/tags/id'},
+        {'GET': '/api/feed'},
+        {'GET': '/api/feed?social_proof=1'},
+        {'GET': '/api/search?q='},
+        {'GET': '/api/tags?prefix='},
+        {'GET': '/api/tags/trending'},
     ]
     return Response(routes)
 
@@ -55,13 +67,33 @@ class MyTokenObtainPairView(TokenObtainPairView):
     serializer_class = MyTokenObtainPairSerializer
 
 
-class UsersList(APIView):
+class MyTokenRefreshView(TokenRefreshView):
+    serializer_class = MyTokenRefreshSerializer
+
+
+class TokenRevokeView(APIView):
+    permission_classes = (AllowAny,)
+    serializer_class = TokenRevokeSerializer
+
+    def post(self, request, format=None, **kwargs):
+        serializer = self.serializer_class(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response({'message': 'Token was successfully revoked'}, status=status.HTTP_200_OK)
+
+
+class UsersList(APIView, CustomPaginationMixin):
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = UserSerializer
+    ordering = ('username',)
 
     def get(self, request, format=None):
-        users = get_users()
-        serializer = self.serializer_class(users, many=True)
-        return Response(serializer.data)
+        users = get_users(request.query_params.get('q'))
+        page = self.paginate_queryset(users)
+        if page is not None:
+            serializer = self.serializer_class(
+                page, many=True, context={'request': request})
+            return self.get_paginated_response(serializer.data)
 
     def post(self, request, format=None, **kwargs):
         serializer = self.serializer_class(data=request.data)
@@ -77,13 +109,14 @@ class UserDetail(APIView):
 
     def get(self, request, username, format=None, **kwargs):
         user = get_user(username)
-        serializer = self.serializer_class(user, many=False)
+        serializer = self.serializer_class(
+            user, many=False, context={'request': request})
         return Response(serializer.data)
 
     def patch(self, request, username, format=None, **kwargs):
         instance = get_user(username)
         request_user = request.user
-        if instance != request_user or not is_superuser(request_user):
+        if not is_same_user(instance, request_user) or not is_superuser(request_user):
             raise PermissionDenied({"message": "You don't have permission to modify",
                                     "user": request_user.username, })
         serializer = self.serializer_class(
@@ -96,22 +129,26 @@ class UserDetail(APIView):
     def delete(self, request, username, format=None, **kwargs):
         user = get_user(username)
         request_user = request.user
-        if user != request_user or not is_superuser(request_user):
+        if not is_same_user(user, request_user) or not is_superuser(request_user):
             raise PermissionDenied({"message": "You don't have permission to modify",
                                     "user": request_user.username, })
         user.delete()
         return Response({'message': f'Instance was successfully deleted'}, status=status.HTTP_200_OK)
 
 
-class UserFollowersList(APIView):
+class UserFollowersList(APIView, CustomPaginationMixin):
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = UserFollowerSerializer
+    ordering = ('-create', '-id')
 
     def get(self, request, username, format=None, **kwargs):
         user_followers = get_user_followers(username)
-        serializer = self.serializer_class(
-            user_followers, many=True, fields=('user',))
-        return Response(serializer.data)
+        page = self.paginate_queryset(user_followers)
+        if page is not None:
+            serializer = self.serializer_class(
+                page, many=True, fields=('user',))
+            return self.get_paginated_response(serializer.data)
 
     def post(self, request, username, format=None, **kwargs):
         follow = get_user(username)
@@ -124,10 +161,9 @@ class UserFollowersList(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     def delete(self, request, username, format=None, **kwargs):
-        followed_user = get_user(username)
         request_user = request.user
-        user_follower = get_user_follower(
-            followed_user.username, request_user.username)
+        user_follower = get_user_follower(username, request_user.username)
+        followed_user = user_follower.following_user
         user_follower.delete()
         return Response({'message': f'{request_user.username} is no more following {followed_user.username} in the system'}, status=status.HTTP_200_OK)
 
@@ -145,7 +181,7 @@ class UserFollowerDetail(APIView):
     def delete(self, request, username, follower_username, format=None, **kwargs):
         request_user = request.user
         user = get_user(username)
-        if user != request_user or not is_superuser(request_user):
+        if not is_same_user(user, request_user) or not is_superuser(request_user):
             raise PermissionDenied({"message": "You don't have permission to modify",
                                     "user": request_user.username, })
         user_follower = get_user_follower(username, follower_username)
@@ -153,17 +189,49 @@ class UserFollowerDetail(APIView):
         return Response({'message': f'{follower_username} is no more following {request_user.username} in the system'}, status=status.HTTP_200_OK)
 
 
-class UserFollowingList(APIView):
+class UserFollowingList(APIView, CustomPaginationMixin):
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = UserFollowerSerializer
+    ordering = ('-create', '-id')
 
     def get(self, request, username, format=None, **kwargs):
         user_followings = get_user_followings(username)
-        serializer = self.serializer_class(
-            user_followings, many=True, fields=('following_user',))
+        page = self.paginate_queryset(user_followings)
+        if page is not None:
+            serializer = self.serializer_class(
+                page, many=True, fields=('following_user',))
+            return self.get_paginated_response(serializer.data)
+
+
+class UserMutualsDetail(APIView):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    serializer_class = MutualsSerializer
+    default_limit = 10
+    max_limit = 100
+
+    def get(self, request, username, other_username, format=None, **kwargs):
+        limit = get_bounded_query_param(
+            request, 'limit', self.default_limit, self.max_limit)
+        mutuals = get_mutuals(username, other_username, limit)
+        serializer = self.serializer_class(mutuals)
         return Response(serializer.data)
 
 
+class UserSuggestionsList(APIView, CustomPaginationMixin):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
+    serializer_class = FollowSuggestionSerializer
+    ordering = ('-score', '-id')
+
+    def get(self, request, username, format=None, **kwargs):
+        suggestions = get_user_suggestions(username)
+        page = self.paginate_queryset(suggestions)
+        if page is not None:
+            serializer = self.serializer_class(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+
 class UserFollowingDetail(APIView):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = UserFollowerSerializer
@@ -176,7 +244,7 @@ class UserFollowingDetail(APIView):
     def delete(self, request, username, following_username, format=None, **kwargs):
         request_user = request.user
         user = get_user(username)
-        if user != request_user or not is_superuser(request_user):
+        if not is_same_user(user, request_user) or not is_superuser(request_user):
             raise PermissionDenied({"message": "You don't have permission to modify",
                                     "user": request_user.username, })
         user_following = get_user_following(username, following_username)
@@ -188,19 +256,20 @@ class PostsList(APIView, CustomPaginationMixin):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = PostSerializer
+    ordering = ('-created', '-id')
 
     def get(self, request, format=None, **kwargs):
-        posts = get_posts(username=kwargs.get('username', None))
+        posts = get_posts(username=kwargs.get('username', None),
+                          related=True)
         page = self.paginate_queryset(posts)
         if page is not None:
-            serializer = self.serializer_class(page, many=True)
+            serializer = self.serializer_class(
+                page, many=True, context={'request': request})
             return self.get_paginated_response(serializer.data)
 
     def post(self, request, format=None, **kwargs):
         user = request.user
         request.data['author'] = user.id
-        tags = request.data.get('tags', [])
-        create_not_existing_tags(tags)
         serializer = self.serializer_class(data=request.data)
         if serializer.is_valid():
             serializer.save()
@@ -213,8 +282,10 @@ class PostDetail(APIView):
     serializer_class = PostSerializer
 
     def get(self, request, post_pk, format=None, **kwargs):
-        post = get_post(post_pk, username=kwargs.get('username', None))
-        serializer = self.serializer_class(post, many=False)
+        post = get_post(post_pk, username=kwargs.get('username', None),
+                        related=True)
+        serializer = self.serializer_class(
+            post, many=False, context={'request': request})
         return Response(serializer.data)
 
     def patch(self, request, post_pk, format=None, **kwargs):
@@ -223,8 +294,6 @@ class PostDetail(APIView):
         if not is_author_or_superuser(user, instance):
             raise PermissionDenied({"message": "You don't have permission to modify this object",
                                     "post_id": instance.id})
-        tags = request.data.get('tags', [])
-        create_not_existing_tags(tags)
         serializer = self.serializer_class(
             instance, data=request.data, partial=True)
         if serializer.is_valid():
@@ -242,10 +311,37 @@ class PostDetail(APIView):
         return Response({'message': f'Instance was successfully deleted'}, status=status.HTTP_200_OK)
 
 
+class FeedList(APIView, CustomPaginationMixin):
+    permission_classes = (IsAuthenticated,)
+    pagination_class = FeedPagination
+    serializer_class = PostSerializer
+
+    def get(self, request, format=None, **kwargs):
+        page = self.paginator.paginate_feed(
+            partial(get_feed_posts, request.user), request)
+        serializer = self.serializer_class(
+            page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
+
+class SearchList(APIView, CustomPaginationMixin):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    pagination_class = SearchPagination
+    serializer_class = PostSerializer
+
+    def get(self, request, format=None, **kwargs):
+        page = self.paginator.paginate_results(
+            partial(search_posts, request.query_params.get('q', '')), request)
+        serializer = self.serializer_class(
+            page, many=True, context={'request': request})
+        return self.get_paginated_response(serializer.data)
+
+
 class CommentsList(APIView, CustomPaginationMixin):
     permission_classes = (IsAuthenticatedOrReadOnly, )
     pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = CommentSerializer
+    ordering = ('-created', '-id')
 
     def get(self, request, post_pk, format=None, **kwargs):
         comments = get_comments(
@@ -307,8 +403,17 @@ class TagsList(APIView, CustomPaginationMixin):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = api_settings.DEFAULT_PAGINATION_CLASS
     serializer_class = TagSerializer
+    ordering = ('-created', '-name')
+    default_suggestions = 10
 
     def get(self, request, format=None, **kwargs):
+        prefix = request.query_params.get('prefix')
+        if prefix and not kwargs.get('post_pk'):
+            limit = get_bounded_query_param(
+                request, 'limit', self.default_suggestions, MAX_SUGGESTIONS)
+            serializer = TagSuggestionSerializer(
+                search_tags(prefix, limit), many=True)
+            return Response(serializer.data)
         tags = get_tags(post_pk=kwargs.get('post_pk', None),
                         username=kwargs.get('username', None))
         page = self.paginate_queryset(tags)
@@ -317,6 +422,24 @@ class TagsList(APIView, CustomPaginationMixin):
             return self.get_paginated_response(serializer.data)
 
 
+class TrendingTagsList(APIView):
+    permission_classes = (IsAuthenticatedOrReadOnly,)
+    serializer_class = TrendingTagSerializer
+    default_hours = 24
+    max_hours = 24 * 7
+    default_limit = 10
+    max_limit = 50
+
+    def get(self, request, format=None, **kwargs):
+        hours = get_bounded_query_param(
+            request, 'hours', self.default_hours, self.max_hours)
+        limit = get_bounded_query_param(
+            request, 'limit', self.default_limit, self.max_limit)
+        tags = get_trending_tags(hours, limit)
+        serializer = self.serializer_class(tags, many=True)
+        return Response(serializer.data)
+
+
 class TagDetail(APIView):
     permission_classes = (IsAuthenticatedOrReadOnly,)
     serializer_class = TagSerializer
@@ -334,12 +457,11 @@ class LikesList(APIView):
 
     def get(self, request, post_pk, format=None, **kwargs):
         post = get_post(post_pk, username=kwargs.get('username', None))
-        if request.user != post.author:
+        if post.author_id != request.user.pk:
             raise PermissionDenied(
                 {"message": "Only the owner can view post likes", })
-        post_likes = post.likes
+        post_likes = post.likes.select_related('liked_user')
         serializer = self.serializer_class(post_likes, many=True)
-        print(serializer.data)
         return Response(serializer.data)
 
     def post(self, request, post_pk, format=None, **kwargs):
@@ -362,7 +484,7 @@ class LikeDetail(APIView):
     def delete(self, request, post_pk, liked_username, format=None, **kwargs):
         request_user = request.user
         user = get_user(liked_username)
-        if request_user != user or not is_superuser(request_user):
+        if not is_same_user(request_user, user) or not is_superuser(request_user):
             raise PermissionDenied(
                 {"message": "Only the author of a like can remove it from the post", })
         liked_user = get_liked_user(
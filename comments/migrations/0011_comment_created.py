@@ -0,0 +1,24 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:28
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0010_alter_comment_text'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='created',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comments_post_created_idx'),
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 
 from django.contrib.auth.models import User
 from posts.models import Post
@@ -11,8 +12,22 @@ class Comment(models.Model):
         Post, on_delete=models.CASCADE, related_name='comments')
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.TextField(blank=False, null=False)
+    created = models.DateTimeField(auto_now_add=True)
     id = models.UUIDField(default=uuid.uuid4, unique=True,
                           primary_key=True, editable=False)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', '-created', '-id'],
+                         name='comments_post_created_idx'),
+        ]
+
     def __str__(self):
         return str(f'{self.post}: {self.text}')
+
+    def delete(self, *args, **kwargs):
+        # Comments removed along with their post skip this on purpose.
+        with transaction.atomic():
+            Post.objects.filter(pk=self.post_id, comments_count__gt=0).update(
+                comments_count=F('comments_count') - 1)
+            return super(Comment, self).delete(*args, **kwargs)
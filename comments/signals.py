@@ -0,0 +1,27 @@
+from django.contrib.auth.models import User
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_save, pre_delete
+
+from posts.models import Post
+from .models import Comment
+
+
+def increment_comments_count(sender, instance, created, **kw):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            comments_count=F('comments_count') + 1)
+
+
+def release_user_comments(sender, instance, **kw):
+    counts = Comment.objects.filter(
+        post=OuterRef('pk'), author=instance).order_by().values(
+        'post').annotate(count=Count('pk')).values('count')
+    Post.objects.filter(comments__author=instance).exclude(
+        author=instance).distinct().update(comments_count=Greatest(
+            F('comments_count') - Subquery(
+                counts, output_field=IntegerField()), 0))
+
+
+post_save.connect(increment_comments_count, sender=Comment)
+pre_delete.connect(release_user_comments, sender=User)
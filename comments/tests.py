@@ -1,3 +1,39 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
 
-# Create your tests here.
+from comments.models import Comment
+from posts.models import Post
+
+
+class CommentEndpointsQueryCountTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author)
+        self.comment = Comment.objects.create(
+            post=self.post, author=self.author, text='text')
+
+    def test_user_post_comment_detail(self):
+        url = (f'/api/users/author/posts/{self.post.pk}'
+               f'/comments/{self.comment.pk}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_post_comment_detail_of_another_author_is_not_found(self):
+        User.objects.create(username='other')
+        url = (f'/api/users/other/posts/{self.post.pk}'
+               f'/comments/{self.comment.pk}/')
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_post_comments_list(self):
+        for index in range(5):
+            commenter = User.objects.create(username=f'commenter{index}')
+            Comment.objects.create(
+                post=self.post, author=commenter, text='text')
+        url = f'/api/users/author/posts/{self.post.pk}/comments/'
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
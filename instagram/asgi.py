@@ -14,3 +14,7 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'instagram.settings')
 
 application = get_asgi_application()
+
+from users.graph import warm_follow_graph
+
+warm_follow_graph()
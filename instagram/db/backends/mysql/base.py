@@ -0,0 +1,9 @@
+from django.db.backends.mysql import base
+
+from instagram.db.pool import PooledDatabaseWrapperMixin
+
+
+class DatabaseWrapper(PooledDatabaseWrapperMixin, base.DatabaseWrapper):
+
+    def check_connection(self, connection):
+        connection.ping()
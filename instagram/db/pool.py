@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+from collections import Counter
+
+from django.db.utils import OperationalError
+
+
+POOL_SIZE = 10
+POOL_MAX_LIFETIME = 3600
+POOL_TIMEOUT = 30
+POOL_HEALTH_CHECK_INTERVAL = 10
+
+
+class PooledConnection(object):
+
+    def __init__(self, connection, params):
+        self.connection = connection
+        self.params = params
+        self.created = time.monotonic()
+        self.last_used = self.created
+
+
+class ConnectionPool(object):
+
+    def __init__(self, connect, check, size=POOL_SIZE,
+                 max_lifetime=POOL_MAX_LIFETIME, timeout=POOL_TIMEOUT,
+                 health_check_interval=POOL_HEALTH_CHECK_INTERVAL):
+        self.connect = connect
+        self.check = check
+        self.size = size
+        self.max_lifetime = max_lifetime
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self.idle = []
+        self.checked_out = {}
+        self.in_use = 0
+        self.condition = threading.Condition()
+        self.metrics = Counter()
+        self.pid = os.getpid()
+
+    def is_expired(self, entry):
+        return (self.max_lifetime is not None
+                and time.monotonic() - entry.created > self.max_lifetime)
+
+    def take_idle(self, params):
+        while self.idle:
+            entry = self.idle.pop()
+            if entry.params == params and not self.is_expired(entry):
+                return entry
+            self.metrics['expired'] += 1
+            self.discard(entry)
+        return None
+
+    def checkout(self, params):
+        started = time.monotonic()
+        waited = False
+        with self.condition:
+            self.metrics['checkouts'] += 1
+            while True:
+                entry = self.take_idle(params)
+                if entry is not None or self.in_use < self.size:
+                    self.in_use += 1
+                    break
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    self.metrics['timeouts'] += 1
+                    raise OperationalError(
+                        'Connection pool exhausted after waiting %ss, %d '
+                        'connections are in use' % (self.timeout, self.in_use))
+                if not waited:
+                    waited = True
+                    self.metrics['waits'] += 1
+                self.condition.wait(remaining)
+            if waited:
+                self.metrics['wait_ms'] += (time.monotonic() - started) * 1000
+
+        try:
+            if entry is not None and (time.monotonic() - entry.last_used
+                                      >= self.health_check_interval):
+                try:
+                    self.check(entry.connection)
+                except Exception:
+                    self.metrics['reconnects'] += 1
+                    self.discard(entry)
+                    entry = None
+            if entry is None:
+                entry = PooledConnection(self.connect(params), params)
+                self.metrics['created'] += 1
+        except BaseException:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+        with self.condition:
+            self.checked_out[id(entry.connection)] = entry
+        return entry.connection
+
+    def release(self, connection, reusable=True):
+        with self.condition:
+            entry = self.checked_out.get(id(connection))
+        if entry is None or entry.connection is not connection:
+            connection.close()
+            return
+        if reusable and not self.is_expired(entry):
+            try:
+                connection.rollback()
+            except Exception:
+                reusable = False
+        else:
+            reusable = False
+        with self.condition:
+            del self.checked_out[id(connection)]
+            self.in_use -= 1
+            if reusable:
+                entry.last_used = time.monotonic()
+                self.idle.append(entry)
+            self.condition.notify()
+        if not reusable:
+            self.discard(entry)
+
+    def discard(self, entry):
+        self.metrics['closed'] += 1
+        try:
+            entry.connection.close()
+        except Exception:
+            pass
+
+    def close_idle(self):
+        with self.condition:
+            idle, self.idle = self.idle, []
+        for entry in idle:
+            self.discard(entry)
+
+    def get_metrics(self):
+        with self.condition:
+            metrics = dict(self.metrics, idle=len(self.idle),
+                           in_use=self.in_use, size=self.size)
+        for name in ('checkouts', 'waits', 'wait_ms', 'timeouts', 'created',
+                     'reconnects', 'expired', 'closed'):
+            metrics.setdefault(name, 0)
+        metrics['wait_ms'] = round(metrics['wait_ms'], 3)
+        return metrics
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, create):
+    # Connections inherited from a parent process share its sockets, so a
+    # forked worker starts from an empty pool instead of reusing them.
+    pool = _pools.get(alias)
+    if pool is None or pool.pid != os.getpid():
+        with _pools_lock:
+            pool = _pools.get(alias)
+            if pool is None or pool.pid != os.getpid():
+                pool = _pools[alias] = create()
+    return pool
+
+
+def get_pool_metrics():
+    return {alias: pool.get_metrics() for alias, pool in list(_pools.items())
+            if pool.pid == os.getpid()}
+
+
+def reset_pools():
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+# Configured by the POOL dictionary of the database settings: SIZE,
+# MAX_LIFETIME, TIMEOUT and HEALTH_CHECK_INTERVAL.
+class PooledDatabaseWrapperMixin(object):
+
+    def get_pool(self):
+        return get_pool(self.alias, self.create_pool)
+
+    def create_pool(self):
+        options = self.settings_dict.get('POOL', {})
+        return ConnectionPool(
+            self.create_connection, self.check_connection,
+            size=options.get('SIZE', POOL_SIZE),
+            max_lifetime=options.get('MAX_LIFETIME', POOL_MAX_LIFETIME),
+            timeout=options.get('TIMEOUT', POOL_TIMEOUT),
+            health_check_interval=options.get(
+                'HEALTH_CHECK_INTERVAL', POOL_HEALTH_CHECK_INTERVAL))
+
+    def create_connection(self, conn_params):
+        return super().get_new_connection(conn_params)
+
+    def check_connection(self, connection):
+        cursor = connection.cursor()
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+
+    def get_new_connection(self, conn_params):
+        return self.get_pool().checkout(conn_params)
+
+    def _close(self):
+        if self.connection is not None:
+            reusable = not self.errors_occurred or self.is_usable()
+            with self.wrap_database_errors:
+                self.get_pool().release(self.connection, reusable)
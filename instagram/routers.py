@@ -0,0 +1,100 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+PIN_COOKIE = 'primary_pin'
+PIN_HEADER = 'X-Primary-Pin'
+PIN_SALT = 'instagram.routers.primary-pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def get_replicas():
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_pin_seconds():
+    return getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10)
+
+
+def is_valid_pin(value):
+    if not value:
+        return False
+    try:
+        signing.TimestampSigner(salt=PIN_SALT).unsign(
+            value, max_age=get_pin_seconds())
+    except signing.BadSignature:
+        return False
+    return True
+
+
+class PrimaryPin(object):
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+current_pin = ContextVar('current_pin', default=None)
+
+
+class ReplicaRouter(object):
+
+    def db_for_read(self, model, **hints):
+        pin = current_pin.get()
+        replicas = get_replicas()
+        if pin is None or not replicas:
+            return None
+        if pin.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        pin = current_pin.get()
+        if pin is not None:
+            pin.pinned = pin.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_replicas():
+            return False
+        return None
+
+
+class ReplicaPinMiddleware(object):
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # The pin is signed rather than stored, so whichever worker serves
+        # the next request can check it: browsers send it back as a cookie,
+        # token clients echo the response header.
+        pinned = (request.method not in SAFE_METHODS
+                  or is_valid_pin(request.COOKIES.get(PIN_COOKIE))
+                  or is_valid_pin(request.headers.get(PIN_HEADER)))
+        pin = PrimaryPin(pinned)
+        token = current_pin.set(pin)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_pin.reset(token)
+        if pin.wrote and get_replicas():
+            self.pin_client(response)
+        return response
+
+    def pin_client(self, response):
+        value = signing.TimestampSigner(salt=PIN_SALT).sign('primary')
+        seconds = get_pin_seconds()
+        response[PIN_HEADER] = value
+        response.set_cookie(PIN_COOKIE, value, max_age=seconds,
+                            httponly=True, samesite='Lax')
@@ -2,6 +2,8 @@ from datetime import timedelta
 from pathlib import Path
 import os
 
+from corsheaders.defaults import default_headers
+
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -23,15 +25,17 @@ INSTALLED_APPS = [
     'posts.apps.PostsConfig',
     'tags.apps.TagsConfig',
     'comments.apps.CommentsConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
     'storages',
     'corsheaders',
 ]
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'api.authentication.StatelessJWTAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination',
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
     'PAGE_SIZE': 10,
 }
 
@@ -65,7 +69,16 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=5),
 }
 
+FEED_FANOUT_THRESHOLD = int(os.environ.get('FEED_FANOUT_THRESHOLD', 10000))
+
+PERFORMANCE_SAMPLE_RATE = float(
+    os.environ.get('PERFORMANCE_SAMPLE_RATE', 0.1))
+PERFORMANCE_SLOW_REQUEST_MS = float(
+    os.environ.get('PERFORMANCE_SLOW_REQUEST_MS', 500))
+
 MIDDLEWARE = [
+    'api.instrumentation.PerformanceMiddleware',
+    'instagram.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -79,6 +92,8 @@ MIDDLEWARE = [
 ]
 
 CORS_ORIGIN_ALLOW_ALL = True
+CORS_ALLOW_HEADERS = list(default_headers) + ['x-primary-pin']
+CORS_EXPOSE_HEADERS = ['X-Primary-Pin']
 
 ROOT_URLCONF = 'instagram.urls'
 
@@ -115,16 +130,57 @@ WSGI_APPLICATION = 'instagram.wsgi.application'
 
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
+        'ENGINE': 'instagram.db.backends.mysql',
         'NAME': 'pTs4SV4NFR',
         'USER': os.environ.get('DB_USER'),
         'PASSWORD': os.environ.get('DB_PASSWORD'),
         'HOST': os.environ.get('DB_HOST'),
         'PORT': '3306',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 0)),
+        'POOL': {
+            'SIZE': int(os.environ.get('DB_POOL_SIZE', 10)),
+            'MAX_LIFETIME': int(os.environ.get('DB_POOL_MAX_LIFETIME', 3600)),
+            'TIMEOUT': float(os.environ.get('DB_POOL_TIMEOUT', 30)),
+            'HEALTH_CHECK_INTERVAL': float(
+                os.environ.get('DB_POOL_HEALTH_CHECK_INTERVAL', 10)),
+        },
     }
 }
 
 
+DATABASE_REPLICAS = []
+
+for index, host in enumerate(filter(None, os.environ.get(
+        'DB_REPLICA_HOSTS', '').split(','))):
+    alias = f'replica{index}'
+    DATABASES[alias] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'MIRROR': 'default'})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['instagram.routers.ReplicaRouter']
+
+DATABASE_REPLICA_PIN_SECONDS = int(
+    os.environ.get('DB_REPLICA_PIN_SECONDS', 10))
+
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'api.performance': {
+            'handlers': ['console'],
+            'level': os.environ.get('PERFORMANCE_LOG_LEVEL', 'INFO'),
+            'propagate': False,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,5 @@
+from .settings import *
+
+# Run the suite with --settings=instagram.test_settings so sampled request
+# logs are not interleaved with the test runner output.
+PERFORMANCE_SAMPLE_RATE = 0
@@ -0,0 +1,188 @@
+import os
+import tempfile
+
+from django.db import DEFAULT_DB_ALIAS, connection, router
+from django.db.utils import OperationalError
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from instagram.db.backends.sqlite3.base import DatabaseWrapper
+from instagram.db.pool import ConnectionPool, get_pool_metrics, reset_pools
+from instagram.routers import (
+    PIN_COOKIE,
+    PIN_HEADER,
+    ReplicaPinMiddleware,
+)
+from posts.models import Post
+
+
+class FakeConnection:
+
+    def __init__(self):
+        self.closed = False
+        self.healthy = True
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def check(connection):
+    if not connection.healthy:
+        raise OSError('Connection lost')
+
+
+class ConnectionPoolTest(SimpleTestCase):
+
+    def create_pool(self, **kwargs):
+        kwargs.setdefault('health_check_interval', 0)
+        return ConnectionPool(lambda params: FakeConnection(), check, **kwargs)
+
+    def test_reuses_released_connections(self):
+        pool = self.create_pool()
+        first = pool.checkout({})
+        pool.release(first)
+        self.assertIs(pool.checkout({}), first)
+        metrics = pool.get_metrics()
+        self.assertEqual(metrics['checkouts'], 2)
+        self.assertEqual(metrics['created'], 1)
+        self.assertEqual(metrics['in_use'], 1)
+
+    def test_replaces_connections_failing_health_check(self):
+        pool = self.create_pool()
+        first = pool.checkout({})
+        pool.release(first)
+        first.healthy = False
+        second = pool.checkout({})
+        self.assertIsNot(second, first)
+        self.assertTrue(first.closed)
+        self.assertEqual(pool.get_metrics()['reconnects'], 1)
+
+    def test_skips_health_check_for_recently_used_connections(self):
+        pool = self.create_pool(health_check_interval=60)
+        first = pool.checkout({})
+        pool.release(first)
+        first.healthy = False
+        self.assertIs(pool.checkout({}), first)
+
+    def test_closes_connections_past_max_lifetime(self):
+        pool = self.create_pool(max_lifetime=0)
+        first = pool.checkout({})
+        pool.release(first)
+        self.assertTrue(first.closed)
+        self.assertIsNot(pool.checkout({}), first)
+
+    def test_discards_connections_for_other_parameters(self):
+        pool = self.create_pool()
+        first = pool.checkout({'database': 'first'})
+        pool.release(first)
+        self.assertIsNot(pool.checkout({'database': 'second'}), first)
+        self.assertTrue(first.closed)
+
+    def test_times_out_when_exhausted(self):
+        pool = self.create_pool(size=1, timeout=0.01)
+        pool.checkout({})
+        with self.assertRaises(OperationalError):
+            pool.checkout({})
+        metrics = pool.get_metrics()
+        self.assertEqual(metrics['waits'], 1)
+        self.assertEqual(metrics['timeouts'], 1)
+
+
+class PooledDatabaseWrapperTest(SimpleTestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.addCleanup(reset_pools)
+        self.database = DatabaseWrapper(dict(
+            connection.settings_dict,
+            NAME=os.path.join(directory.name, 'pooled.sqlite3'),
+            POOL={'SIZE': 2, 'HEALTH_CHECK_INTERVAL': 0}), alias='pooled')
+        self.addCleanup(self.database.close)
+
+    def test_reuses_connection_across_requests(self):
+        for _ in range(3):
+            with self.database.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            self.database.close()
+        metrics = get_pool_metrics()['pooled']
+        self.assertEqual(metrics['checkouts'], 3)
+        self.assertEqual(metrics['created'], 1)
+        self.assertEqual(metrics['idle'], 1)
+        self.assertEqual(metrics['in_use'], 0)
+
+    def test_rolls_back_connection_closed_in_transaction(self):
+        with self.database.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (name TEXT)')
+        self.database.set_autocommit(False)
+        with self.database.cursor() as cursor:
+            cursor.execute("INSERT INTO item VALUES ('uncommitted')")
+        self.database.close()
+        self.database.connect()
+        with self.database.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone(), (0,))
+        self.assertEqual(get_pool_metrics()['pooled']['created'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica0', 'replica1'])
+class ReplicaRouterTest(SimpleTestCase):
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def serve(self, request, write=False):
+        reads = []
+
+        def view(request):
+            reads.append(router.db_for_read(Post))
+            if write:
+                router.db_for_write(Post)
+                reads.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        return ReplicaPinMiddleware(view)(request), reads
+
+    def test_reads_go_to_replicas(self):
+        response, reads = self.serve(self.factory.get('/'))
+        self.assertIn(reads[0], ('replica0', 'replica1'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_after_write_go_to_primary(self):
+        response, reads = self.serve(self.factory.post('/'), write=True)
+        self.assertEqual(reads, [DEFAULT_DB_ALIAS, DEFAULT_DB_ALIAS])
+        cookie = response.cookies[PIN_COOKIE]
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = cookie.value
+        _, reads = self.serve(request)
+        self.assertEqual(reads, [DEFAULT_DB_ALIAS])
+
+    def test_reads_after_token_client_write_go_to_primary(self):
+        response, _ = self.serve(self.factory.post('/'), write=True)
+        request = self.factory.get(
+            '/', HTTP_X_PRIMARY_PIN=response[PIN_HEADER])
+        _, reads = self.serve(request)
+        self.assertEqual(reads, [DEFAULT_DB_ALIAS])
+
+    def test_forged_pins_are_ignored(self):
+        request = self.factory.get('/', HTTP_X_PRIMARY_PIN='primary:forged')
+        _, reads = self.serve(request)
+        self.assertIn(reads[0], ('replica0', 'replica1'))
+
+    @override_settings(DATABASE_REPLICA_PIN_SECONDS=-1)
+    def test_expired_pins_are_ignored(self):
+        response, _ = self.serve(self.factory.post('/'), write=True)
+        request = self.factory.get(
+            '/', HTTP_X_PRIMARY_PIN=response[PIN_HEADER])
+        _, reads = self.serve(request)
+        self.assertIn(reads[0], ('replica0', 'replica1'))
+
+    def test_reads_outside_requests_go_to_primary(self):
+        self.assertEqual(router.db_for_read(Post), DEFAULT_DB_ALIAS)
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(router.allow_migrate('replica0', 'posts'))
+        self.assertTrue(router.allow_migrate(DEFAULT_DB_ALIAS, 'posts'))
@@ -14,3 +14,7 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'instagram.settings')
 
 application = get_wsgi_application()
+
+from users.graph import warm_follow_graph
+
+warm_follow_graph()
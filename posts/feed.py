@@ -0,0 +1,104 @@
+import heapq
+from functools import partial
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from users.models import Profile, UserFollowing
+from .models import Post, PulledAuthor, TimelineEntry
+
+
+FANOUT_BATCH_SIZE = getattr(settings, 'FEED_FANOUT_BATCH_SIZE', 1000)
+BACKFILL_SIZE = getattr(settings, 'FEED_BACKFILL_SIZE', 100)
+
+
+def get_fanout_threshold():
+    return getattr(settings, 'FEED_FANOUT_THRESHOLD', None)
+
+
+def has_too_many_followers(author_id):
+    threshold = get_fanout_threshold()
+    return threshold is not None and Profile.objects.filter(
+        user_id=author_id, followers_count__gte=threshold).exists()
+
+
+def insert_timeline_entries(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, FANOUT_BATCH_SIZE))
+        if not batch:
+            break
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def push_post(post_pk, author_id, created):
+    followers = UserFollowing.objects.filter(
+        following_user_id=author_id).values_list('user_id', flat=True)
+    insert_timeline_entries(
+        TimelineEntry(user_id=follower_id, post_id=post_pk, created=created)
+        for follower_id in followers.iterator())
+
+
+def fan_out_post(post):
+    # Once an author has posted with too many followers, all of their posts
+    # are read at feed time, even after they fall below the threshold.
+    if has_too_many_followers(post.author_id):
+        PulledAuthor.objects.bulk_create(
+            [PulledAuthor(author_id=post.author_id)], ignore_conflicts=True)
+        return
+    # The writes to every follower's timeline happen after the post is
+    # committed, outside the request's transaction.
+    transaction.on_commit(partial(
+        push_post, post.pk, post.author_id, post.created))
+
+
+def backfill_timeline(user_id, author_id):
+    if PulledAuthor.objects.filter(author_id=author_id).exists():
+        return
+    posts = Post.objects.filter(author_id=author_id).order_by(
+        '-created').values_list('pk', 'created')[:BACKFILL_SIZE]
+    insert_timeline_entries(
+        TimelineEntry(user_id=user_id, post_id=post_pk, created=created)
+        for post_pk, created in posts)
+
+
+def prune_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def filter_before(queryset, position, field):
+    if position is None:
+        return queryset
+    created, pk = position
+    return queryset.filter(Q(created__lt=created)
+                           | Q(created=created, **{f'{field}__lt': pk}))
+
+
+def assemble_feed(user_id, limit, before=None):
+    # Both sources are sorted on (created, id), so merging the first `limit`
+    # rows after the cursor from the timeline and from the pulled followees
+    # is enough.
+    timeline = TimelineEntry.objects.filter(user_id=user_id)
+    pulled_followees = UserFollowing.objects.filter(
+        user_id=user_id, following_user_id__in=PulledAuthor.objects.values(
+            'author_id')).values('following_user_id')
+    pulled_posts = Post.objects.filter(author_id__in=pulled_followees)
+    sources = [
+        filter_before(timeline, before, 'post').order_by(
+            '-created', '-post').values_list('created', 'post_id')[:limit],
+        filter_before(pulled_posts, before, 'pk').order_by(
+            '-created', '-pk').values_list('created', 'pk')[:limit],
+    ]
+    post_pks = []
+    seen = set()
+    for _, post_pk in heapq.merge(*sources, reverse=True):
+        if post_pk in seen:
+            continue
+        seen.add(post_pk)
+        post_pks.append(post_pk)
+        if len(post_pks) == limit:
+            break
+    return post_pks
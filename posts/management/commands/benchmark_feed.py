@@ -0,0 +1,122 @@
+import json
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import override_settings
+
+from posts.feed import assemble_feed
+from posts.models import Post, TimelineEntry
+from users.management.commands.reconcile_follow_counts import reconcile_follow_counts
+from users.models import Profile, UserFollowing
+
+
+def uniform_followers(users_number, rng):
+    return [20] * users_number
+
+
+def power_law_followers(users_number, rng):
+    return [min(int(rng.paretovariate(1.2) * 5), users_number - 1)
+            for _ in range(users_number)]
+
+
+def celebrity_followers(users_number, rng):
+    celebrities = max(users_number // 100, 1)
+    return [int(users_number * 0.9) if index < celebrities else 10
+            for index in range(users_number)]
+
+
+DISTRIBUTIONS = {
+    'uniform': uniform_followers,
+    'power_law': power_law_followers,
+    'celebrity': celebrity_followers,
+}
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def summarize(durations):
+    return {
+        'p50_ms': round(percentile(durations, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(durations, 0.95) * 1000, 3),
+        'max_ms': round(max(durations) * 1000, 3),
+    }
+
+
+class Command(BaseCommand):
+    help = 'Compares write amplification and read latency of the push and hybrid feeds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--posts', type=int, default=200)
+        parser.add_argument('--reads', type=int, default=200)
+        parser.add_argument('--page-size', type=int, default=10)
+        parser.add_argument('--threshold', type=int, default=100)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        results = []
+        for distribution in DISTRIBUTIONS:
+            for mode, threshold in (('push', None),
+                                    ('hybrid', options['threshold'])):
+                result = self.run_scenario(distribution, threshold, options)
+                result.update(distribution=distribution, mode=mode,
+                              threshold=threshold)
+                results.append(result)
+        self.stdout.write(json.dumps(results, indent=2))
+
+    def run_scenario(self, distribution, threshold, options):
+        # Runs in autocommit so the timeline writes deferred to on_commit
+        # are part of the measured post creation.
+        rng = random.Random(options['seed'])
+        with override_settings(FEED_FANOUT_THRESHOLD=threshold):
+            user_ids = self.create_graph(distribution, options['users'], rng)
+            try:
+                existing_rows = TimelineEntry.objects.count()
+                write_times = []
+                for _ in range(options['posts']):
+                    started = time.perf_counter()
+                    Post.objects.create(author_id=rng.choice(user_ids))
+                    write_times.append(time.perf_counter() - started)
+                timeline_rows = TimelineEntry.objects.count() - existing_rows
+                read_times = []
+                for _ in range(options['reads']):
+                    started = time.perf_counter()
+                    post_pks = assemble_feed(
+                        rng.choice(user_ids), options['page_size'])
+                    list(Post.objects.filter(pk__in=post_pks))
+                    read_times.append(time.perf_counter() - started)
+            finally:
+                with transaction.atomic():
+                    User.objects.filter(pk__in=user_ids).delete()
+        return {
+            'timeline_rows': timeline_rows,
+            'rows_per_post': round(timeline_rows / options['posts'], 2),
+            'write': summarize(write_times),
+            'read': summarize(read_times),
+        }
+
+    def create_graph(self, distribution, users_number, rng):
+        prefix = f'feed-benchmark-{distribution}-'
+        User.objects.bulk_create(
+            User(username=f'{prefix}{index}') for index in range(users_number))
+        user_ids = list(User.objects.filter(
+            username__startswith=prefix).values_list('pk', flat=True))
+        Profile.objects.bulk_create(
+            Profile(user_id=user_id) for user_id in user_ids)
+        followers_numbers = DISTRIBUTIONS[distribution](users_number, rng)
+        followings = []
+        for user_id, followers_number in zip(user_ids, followers_numbers):
+            for follower_id in rng.sample(user_ids, followers_number):
+                if follower_id != user_id:
+                    followings.append(UserFollowing(
+                        user_id=follower_id, following_user_id=user_id))
+        UserFollowing.objects.bulk_create(
+            followings, batch_size=1000, ignore_conflicts=True)
+        reconcile_follow_counts()
+        return user_ids
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from comments.models import Comment
+from posts.models import Post, PostLike
+
+
+def count_per_post(model):
+    counts = model.objects.filter(post=OuterRef('pk')).order_by().values(
+        'post').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def rebuild_post_counters():
+    return Post.objects.update(likes_count=count_per_post(PostLike),
+                               comments_count=count_per_post(Comment))
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Post.likes_count and Post.comments_count from the likes and comments tables'
+
+    def handle(self, *args, **options):
+        updated = rebuild_post_counters()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt counters for {updated} posts'))
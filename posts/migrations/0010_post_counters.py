@@ -0,0 +1,41 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:24
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostLike = apps.get_model('posts', 'PostLike')
+    Comment = apps.get_model('comments', 'Comment')
+
+    def count_per_post(model):
+        counts = model.objects.filter(post=OuterRef('pk')).order_by().values(
+            'post').annotate(count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Post.objects.update(likes_count=count_per_post(PostLike),
+                        comments_count=count_per_post(Comment))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('comments', '0010_alter_comment_text'),
+        ('posts', '0009_post_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 20:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def copy_pulled_authors(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    PulledAuthor = apps.get_model('posts', 'PulledAuthor')
+    PulledAuthor.objects.bulk_create(
+        (PulledAuthor(author_id=user_id) for user_id in Profile.objects.filter(
+            has_pulled_posts=True).values_list('user_id', flat=True)),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('posts', '0013_post_created_idx'),
+        ('users', '0015_profile_has_pulled_posts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PulledAuthor',
+            fields=[
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to='auth.user')),
+                ('created', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RunPython(copy_pulled_authors, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F
 from django.contrib.auth.models import User
 from tags.models import Tag
 
@@ -22,13 +23,27 @@ class Post(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     id = models.UUIDField(default=uuid.uuid4, unique=True,
                           primary_key=True, editable=False)
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created', '-id'],
+                         name='posts_created_idx'),
+            models.Index(fields=['author', '-created', '-id'],
+                         name='posts_author_created_idx'),
+        ]
 
     def __str__(self):
         return f'{str(self.author)}: {str(self.description)[:50]}'
 
     @property
     def likes_number(self):
-        return self.likes.count()
+        return self.likes_count
+
+    @property
+    def comments_number(self):
+        return self.comments_count
 
 
 class PostLike(models.Model):
@@ -44,6 +59,41 @@ class PostLike(models.Model):
     def __str__(self):
         return f'{self.liked_user} liked {self.post}'
 
+    def delete(self, *args, **kwargs):
+        # Not a post_delete receiver: a listener would stop deleting a post
+        # from removing its likes in a single query.
+        with transaction.atomic():
+            Post.objects.filter(pk=self.post_id, likes_count__gt=0).update(
+                likes_count=F('likes_count') - 1)
+            return super(PostLike, self).delete(*args, **kwargs)
+
+
+class PulledAuthor(models.Model):
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name='+')
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.author} is read at feed time'
+
+
+class TimelineEntry(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name='timeline')
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='timeline_entries')
+    created = models.DateTimeField()
+
+    class Meta:
+        unique_together = (('user', 'post'),)
+        indexes = [
+            models.Index(fields=['user', '-created', '-post'],
+                         name='posts_timeline_feed_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.post} in timeline of {self.user}'
+
 
 class PostPhoto(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete
+
+from users.models import UserFollowing, unfollowed
+from .feed import backfill_timeline, fan_out_post, prune_timeline
+from .models import Post, PostLike
+
+
+def increment_likes_count(sender, instance, created, **kw):
+    if created:
+        Post.objects.filter(pk=instance.post_id).update(
+            likes_count=F('likes_count') + 1)
+
+
+def release_user_likes(sender, instance, **kw):
+    # Likes cascade with the account without firing PostLike.delete().
+    Post.objects.filter(likes__liked_user=instance, likes_count__gt=0).exclude(
+        author=instance).update(likes_count=F('likes_count') - 1)
+
+
+def push_to_timelines(sender, instance, created, **kw):
+    if created:
+        fan_out_post(instance)
+
+
+def fill_follower_timeline(sender, instance, created, **kw):
+    if created:
+        backfill_timeline(instance.user_id, instance.following_user_id)
+
+
+def prune_follower_timeline(sender, instance, **kw):
+    prune_timeline(instance.user_id, instance.following_user_id)
+
+
+post_save.connect(increment_likes_count, sender=PostLike)
+pre_delete.connect(release_user_likes, sender=User)
+post_save.connect(push_to_timelines, sender=Post)
+post_save.connect(fill_follower_timeline, sender=UserFollowing)
+unfollowed.connect(prune_follower_timeline, sender=UserFollowing)
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import base64
+import json
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models.deletion import Collector
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from comments.models import Comment
+from posts.management.commands.rebuild_post_counters import rebuild_post_counters
+from posts.models import Post, PostLike, PulledAuthor, TimelineEntry
+from users.models import UserFollowing
+
+
+class PostCommentsQueryCountTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.commenters = [User.objects.create(username=f'commenter{i}')
+                           for i in range(5)]
+        self.posts = [Post.objects.create(author=self.author,
+                                          description=f'post {i}')
+                      for i in range(3)]
+
+    def add_comments(self, number):
+        Comment.objects.bulk_create([
+            Comment(post=post, author=self.commenters[i % 5], text=f'{i}')
+            for post in self.posts for i in range(number)])
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_posts_list_queries_do_not_grow_with_comments(self):
+        self.add_comments(1)
+        few = self.count_queries('/api/posts/')
+        self.add_comments(20)
+        many = self.count_queries('/api/posts/')
+        self.assertEqual(few, many)
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        url = f'/api/posts/{self.posts[0].pk}/'
+        self.add_comments(1)
+        few = self.count_queries(url)
+        self.add_comments(20)
+        many = self.count_queries(url)
+        self.assertEqual(few, many)
+
+    def test_embedded_comments_keep_their_shape(self):
+        self.add_comments(1)
+        response = self.client.get(f'/api/posts/{self.posts[0].pk}/')
+        self.assertEqual(response.data['author'], 'author')
+        self.assertEqual(response.data['comments'],
+                         [{'author': 'commenter0', 'text': '0'}])
+
+
+class PostCountersTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author)
+
+    def test_counters_follow_likes_and_comments(self):
+        like = PostLike.objects.create(post=self.post, liked_user=self.author)
+        comment = Comment.objects.create(
+            post=self.post, author=self.author, text='text')
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count),
+                         (1, 1))
+        like.delete()
+        comment.delete()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count),
+                         (0, 0))
+
+    def get_post_deletion_queries(self, size):
+        post = Post.objects.create(author=self.author)
+        for index in range(size):
+            user = User.objects.create(username=f'user{size}-{index}')
+            PostLike.objects.create(post=post, liked_user=user)
+            Comment.objects.create(post=post, author=user, text='text')
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_post_deletion_does_not_grow_with_likes_and_comments(self):
+        self.assertTrue(Collector(using='default').can_fast_delete(
+            self.post.likes.all()))
+        self.assertEqual(self.get_post_deletion_queries(1),
+                         self.get_post_deletion_queries(5))
+
+    def test_account_deletion_releases_likes_and_comments(self):
+        reader = User.objects.create(username='reader')
+        PostLike.objects.create(post=self.post, liked_user=reader)
+        PostLike.objects.create(post=self.post, liked_user=self.author)
+        for text in ('one', 'two'):
+            Comment.objects.create(post=self.post, author=reader, text=text)
+        reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count),
+                         (1, 0))
+
+    def test_rebuild_repairs_drift(self):
+        PostLike.objects.create(post=self.post, liked_user=self.author)
+        Post.objects.update(likes_count=7, comments_count=3)
+        rebuild_post_counters()
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.likes_count, self.post.comments_count),
+                         (1, 0))
+
+
+class FeedTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.reader = User.objects.create(username='reader')
+        self.client.force_authenticate(self.reader)
+
+    def create_post(self, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Post.objects.create(author=author)
+
+    def feed_ids(self):
+        response = self.client.get('/api/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.data['results']]
+
+    def test_new_posts_reach_followers(self):
+        UserFollowing.objects.create(
+            user=self.reader, following_user=self.author)
+        first = self.create_post(self.author)
+        second = self.create_post(self.author)
+        self.assertEqual(self.feed_ids(), [str(second.pk), str(first.pk)])
+
+    def test_fan_out_runs_after_commit(self):
+        UserFollowing.objects.create(
+            user=self.reader, following_user=self.author)
+        with self.captureOnCommitCallbacks() as callbacks:
+            Post.objects.create(author=self.author)
+        self.assertFalse(TimelineEntry.objects.exists())
+        for callback in callbacks:
+            callback()
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader).exists())
+
+    def test_follow_backfills_and_unfollow_prunes(self):
+        post = self.create_post(self.author)
+        following = UserFollowing.objects.create(
+            user=self.reader, following_user=self.author)
+        self.assertEqual(self.feed_ids(), [str(post.pk)])
+        following.delete()
+        self.assertEqual(self.feed_ids(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(FEED_FANOUT_THRESHOLD=2)
+    def test_posts_of_popular_authors_are_merged_at_read_time(self):
+        celebrity = User.objects.create(username='celebrity')
+        fan = User.objects.create(username='fan')
+        for user in (self.reader, fan):
+            UserFollowing.objects.create(user=user, following_user=celebrity)
+        UserFollowing.objects.create(
+            user=self.reader, following_user=self.author)
+        first = self.create_post(self.author)
+        second = self.create_post(celebrity)
+        third = self.create_post(self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=second).exists())
+        self.assertEqual(self.feed_ids(),
+                         [str(third.pk), str(second.pk), str(first.pk)])
+
+    @override_settings(FEED_FANOUT_THRESHOLD=2)
+    def test_pages_follow_the_cursor(self):
+        celebrity = User.objects.create(username='celebrity')
+        fan = User.objects.create(username='fan')
+        for user in (self.reader, fan):
+            UserFollowing.objects.create(user=user, following_user=celebrity)
+        UserFollowing.objects.create(
+            user=self.reader, following_user=self.author)
+        posts = [self.create_post(author)
+                 for author in (self.author, celebrity) * 3]
+        expected = [str(post.pk) for post in sorted(
+            posts, key=lambda post: (post.created, post.pk), reverse=True)]
+        ids = []
+        url = '/api/feed/?limit=4&offset=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            ids.extend(post['id'] for post in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(ids, expected)
+        self.create_post(self.author)
+        response = self.client.get(url or '/api/feed/', {'cursor': 'e30='})
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(FEED_FANOUT_THRESHOLD=2)
+    def test_posts_written_while_pulled_stay_in_feeds(self):
+        celebrity = User.objects.create(username='celebrity')
+        fan = User.objects.create(username='fan')
+        for user in (self.reader, fan):
+            UserFollowing.objects.create(user=user, following_user=celebrity)
+        post = self.create_post(celebrity)
+        UserFollowing.objects.get(user=fan).delete()
+        self.assertEqual(self.feed_ids(), [str(post.pk)])
+        self.assertTrue(PulledAuthor.objects.filter(author=celebrity).exists())
+
+
+class PostsPaginationTest(APITestCase):
+
+    def setUp(self):
+        author = User.objects.create(username='author')
+        self.posts = [Post.objects.create(author=author) for _ in range(5)]
+        self.expected = [str(post.pk) for post in sorted(
+            self.posts, key=lambda post: (post.created, post.pk), reverse=True)]
+
+    def test_cursor_pages_walk_forward_and_back(self):
+        first = self.client.get('/api/posts/', {'limit': 2})
+        self.assertNotIn('count', first.data)
+        second = self.client.get(first.data['next'])
+        third = self.client.get(second.data['next'])
+        self.assertIsNone(third.data['next'])
+        ids = [post['id'] for page in (first, second, third)
+               for post in page.data['results']]
+        self.assertEqual(ids, self.expected)
+        back = self.client.get(third.data['previous'])
+        self.assertEqual(back.data['results'], second.data['results'])
+
+    def test_limit_offset_still_supported(self):
+        response = self.client.get('/api/posts/', {'limit': 2, 'offset': 2})
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([post['id'] for post in response.data['results']],
+                         self.expected[2:4])
+
+    def test_invalid_cursor_is_not_found(self):
+        response = self.client.get('/api/posts/', {'cursor': 'nonsense'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_tampered_cursor_is_not_found(self):
+        for url, position in (
+                ('/api/users/author/followers/', ['2020-01-01', 'abc']),
+                ('/api/posts/', [{'created': 1}, 'abc']),
+                ('/api/posts/', [None, None])):
+            cursor = base64.urlsafe_b64encode(
+                json.dumps([position, False]).encode()).decode()
+            response = self.client.get(url, {'cursor': cursor})
+            self.assertEqual(response.status_code, 404, (url, position))
+
+
+class PostEndpointsQueryCountTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.post = Post.objects.create(author=self.author)
+        self.post.tags.create(name='tag')
+
+    def test_user_post_detail(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                f'/api/users/author/posts/{self.post.pk}/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_post_tag_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/users/author/posts/{self.post.pk}/tags/tag/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_post_tags_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get(
+                f'/api/users/author/posts/{self.post.pk}/tags/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_post_of_another_author_is_not_found(self):
+        User.objects.create(username='other')
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                f'/api/users/other/posts/{self.post.pk}/')
+        self.assertEqual(response.status_code, 404)
+
+
+class PostTagsWriteTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client.force_authenticate(self.author)
+
+    def create_post(self, tags):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.post(
+                '/api/posts/', {'description': 'post', 'tags': tags},
+                format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(response.data['tags']), sorted(set(tags)))
+        return len(context)
+
+    def test_tag_writes_do_not_grow_with_tags(self):
+        self.create_post(['warmup'])
+        few = self.create_post(['one'])
+        many = self.create_post([f'tag{index}' for index in range(30)])
+        self.assertEqual(few, many)
+
+    def test_existing_and_repeated_tags_are_reused(self):
+        self.create_post(['old'])
+        self.create_post(['old', 'new', 'new'])
+        post = Post.objects.get(tags='new')
+        self.assertEqual(sorted(post.tags.values_list('name', flat=True)),
+                         ['new', 'old'])
+
+    def test_patch_replaces_tags(self):
+        self.create_post(['old'])
+        post = Post.objects.get()
+        response = self.client.patch(
+            f'/api/posts/{post.pk}/', {'tags': ['new']}, format='json')
+        self.assertEqual(response.data['tags'], ['new'])
+
+
+class ViewerFlagsTest(APITestCase):
+
+    def setUp(self):
+        self.viewer = User.objects.create(username='viewer')
+        self.followed = User.objects.create(username='followed')
+        self.other = User.objects.create(username='other')
+        UserFollowing.objects.create(user=self.viewer,
+                                     following_user=self.followed)
+        self.liked = Post.objects.create(author=self.followed)
+        self.unliked = Post.objects.create(author=self.other)
+        PostLike.objects.create(post=self.liked, liked_user=self.viewer)
+
+    def get_flags(self, response):
+        return {post['id']: (post['viewer_has_liked'],
+                             post['viewer_follows_author'])
+                for post in response.data['results']}
+
+    def test_flags_for_a_page(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get('/api/posts/')
+        self.assertEqual(self.get_flags(response), {
+            str(self.liked.pk): (True, True),
+            str(self.unliked.pk): (False, False),
+        })
+        response = self.client.get(f'/api/posts/{self.liked.pk}/')
+        self.assertEqual((response.data['viewer_has_liked'],
+                          response.data['viewer_follows_author']),
+                         (True, True))
+
+    def test_flags_cost_two_queries_per_page(self):
+        self.client.force_authenticate(self.viewer)
+        with CaptureQueriesContext(connection) as few:
+            self.client.get('/api/posts/')
+        for index in range(8):
+            post = Post.objects.create(author=self.followed)
+            PostLike.objects.create(post=post, liked_user=self.viewer)
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/api/posts/')
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(len(few), len(many))
+
+    def test_anonymous_viewer_has_no_flags(self):
+        response = self.client.get('/api/posts/')
+        self.assertEqual(set(self.get_flags(response).values()), {(None, None)})
+
+
+class SocialProofTest(APITestCase):
+
+    def setUp(self):
+        self.viewer = User.objects.create(username='viewer')
+        self.followed = [User.objects.create(username=f'followed{index}')
+                         for index in range(5)]
+        self.stranger = User.objects.create(username='stranger')
+        for user in self.followed:
+            UserFollowing.objects.create(user=self.viewer, following_user=user)
+        self.popular = Post.objects.create(author=self.stranger)
+        self.quiet = Post.objects.create(author=self.stranger)
+        for user in self.followed + [self.stranger]:
+            PostLike.objects.create(post=self.popular, liked_user=user)
+        PostLike.objects.create(post=self.quiet, liked_user=self.stranger)
+        self.client.force_authenticate(self.viewer)
+
+    def get_social_proof(self, url):
+        response = self.client.get(url, {'social_proof': '1'})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_page_social_proof(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.get_social_proof('/api/posts/')
+        proofs = {post['id']: post['liked_by_following']
+                  for post in data['results']}
+        popular = proofs[str(self.popular.pk)]
+        self.assertEqual(popular['count'], 5)
+        self.assertEqual(len(popular['usernames']), 3)
+        self.assertTrue(set(popular['usernames']) <= {
+            user.username for user in self.followed})
+        self.assertEqual(proofs[str(self.quiet.pk)],
+                         {'usernames': [], 'count': 0})
+        social_proof_queries = [query for query in queries
+                                if 'users_userfollowing' in query['sql']
+                                and 'posts_postlike' in query['sql']]
+        self.assertEqual(len(social_proof_queries), 1)
+
+    def test_single_post_social_proof(self):
+        data = self.get_social_proof(f'/api/posts/{self.popular.pk}/')
+        self.assertEqual(data['liked_by_following']['count'], 5)
+
+    def test_social_proof_is_optional(self):
+        response = self.client.get('/api/posts/')
+        self.assertNotIn('liked_by_following', response.data['results'][0])
@@ -0,0 +1,32 @@
+from .models import Posting
+from .tokens import count_terms
+
+
+DESCRIPTION_WEIGHT = 2
+COMMENT_WEIGHT = 1
+
+
+def build_postings(text, weight, post_id, created, comment_id=None):
+    return [Posting(term=term, post_id=post_id, comment_id=comment_id,
+                    weight=count * weight, created=created)
+            for term, count in count_terms(text).items()]
+
+
+def get_post_postings(post_id, description, created):
+    return build_postings(description, DESCRIPTION_WEIGHT, post_id, created)
+
+
+def get_comment_postings(comment_id, post_id, text, created):
+    return build_postings(text, COMMENT_WEIGHT, post_id, created, comment_id)
+
+
+def index_post(post):
+    Posting.objects.filter(post=post, comment__isnull=True).delete()
+    Posting.objects.bulk_create(get_post_postings(
+        post.pk, post.description, post.created))
+
+
+def index_comment(comment):
+    Posting.objects.filter(comment=comment).delete()
+    Posting.objects.bulk_create(get_comment_postings(
+        comment.pk, comment.post_id, comment.text, comment.post.created))
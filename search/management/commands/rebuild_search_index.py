@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import Post
+from comments.models import Comment
+from search.indexing import get_comment_postings, get_post_postings
+from search.models import Posting
+
+
+BATCH_SIZE = 1000
+
+
+def bulk_insert(postings):
+    batch = []
+    inserted = 0
+    for posting_list in postings:
+        batch.extend(posting_list)
+        if len(batch) >= BATCH_SIZE:
+            Posting.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            inserted += len(batch)
+            batch = []
+    Posting.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+    return inserted + len(batch)
+
+
+def rebuild_search_index():
+    posts = Post.objects.values_list('pk', 'description', 'created')
+    comments = Comment.objects.values_list(
+        'pk', 'post_id', 'text', 'post__created')
+    with transaction.atomic():
+        Posting.objects.all().delete()
+        inserted = bulk_insert(
+            get_post_postings(*row)
+            for row in posts.iterator(chunk_size=BATCH_SIZE))
+        inserted += bulk_insert(
+            get_comment_postings(*row)
+            for row in comments.iterator(chunk_size=BATCH_SIZE))
+    return inserted
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the search index from post descriptions and comments'
+
+    def handle(self, *args, **options):
+        inserted = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {inserted} postings'))
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:37
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0013_post_created_idx'),
+        ('comments', '0011_comment_created'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveIntegerField(default=1)),
+                ('comment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='comments.comment')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='posts.post')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='posting',
+            index=models.Index(fields=['term', 'post'], name='search_posting_term_idx'),
+        ),
+    ]
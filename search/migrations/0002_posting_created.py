@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 21:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.utils.timezone
+
+
+def fill_created(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Posting = apps.get_model('search', 'Posting')
+    Posting.objects.update(created=Subquery(Post.objects.filter(
+        pk=OuterRef('post')).values('created')[:1]))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='posting',
+            name='created',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_created, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='posting',
+            index=models.Index(fields=['term', '-created'], name='search_posting_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+from posts.models import Post
+from comments.models import Comment
+
+
+class Posting(models.Model):
+    term = models.CharField(max_length=64)
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name='postings')
+    comment = models.ForeignKey(
+        Comment, on_delete=models.CASCADE, related_name='postings',
+        blank=True, null=True)
+    weight = models.PositiveIntegerField(default=1)
+    created = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['term', 'post'],
+                         name='search_posting_term_idx'),
+            models.Index(fields=['term', '-created'],
+                         name='search_posting_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.term}: {self.post_id}'
@@ -0,0 +1,23 @@
+from django.db.models.signals import post_save
+
+from posts.models import Post
+from comments.models import Comment
+from .indexing import index_comment, index_post
+
+
+def is_changed(field_name, created, update_fields):
+    return created or update_fields is None or field_name in update_fields
+
+
+def reindex_post(sender, instance, created, update_fields, **kw):
+    if is_changed('description', created, update_fields):
+        index_post(instance)
+
+
+def reindex_comment(sender, instance, created, update_fields, **kw):
+    if is_changed('text', created, update_fields):
+        index_comment(instance)
+
+
+post_save.connect(reindex_post, sender=Post)
+post_save.connect(reindex_comment, sender=Comment)
@@ -0,0 +1,68 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from comments.models import Comment
+from posts.models import Post
+from search.management.commands.rebuild_search_index import rebuild_search_index
+from search.models import Posting
+
+
+class SearchTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.older = Post.objects.create(
+            author=self.author, description='Sunset over the lake')
+        self.newer = Post.objects.create(
+            author=self.author, description='Lake trip, lake swim')
+        self.commented = Post.objects.create(
+            author=self.author, description='Holiday')
+        self.comment = Comment.objects.create(
+            post=self.commented, author=self.author, text='Nice sunset!')
+
+    def search(self, query):
+        response = self.client.get('/api/search/', {'q': query})
+        self.assertEqual(response.status_code, 200)
+        return [post['id'] for post in response.data['results']]
+
+    def test_ranks_by_relevance_then_recency(self):
+        self.assertEqual(self.search('LAKE'),
+                         [str(self.newer.pk), str(self.older.pk)])
+        self.assertEqual(self.search('sunset'),
+                         [str(self.older.pk), str(self.commented.pk)])
+        self.assertEqual(self.search('sunset lake'), [str(self.older.pk)])
+        self.assertEqual(self.search('the'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.older.description = 'Mountains'
+        self.older.save()
+        self.comment.delete()
+        self.assertEqual(self.search('sunset'), [])
+        self.assertEqual(self.search('mountains'), [str(self.older.pk)])
+        self.newer.delete()
+        self.assertEqual(self.search('lake'), [])
+
+    def test_only_the_newest_postings_of_the_rarest_term_are_scored(self):
+        for index in range(3):
+            Post.objects.create(author=self.author, description='lake view')
+        with mock.patch('api.utils.SEARCH_MAX_CANDIDATES', 2):
+            self.assertEqual(len(self.search('lake')), 2)
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.search('sunset lake'),
+                                 [str(self.older.pk)])
+        candidates = [query['sql'] for query in queries
+                      if 'ORDER BY "search_posting"."created" DESC' in query['sql']]
+        self.assertEqual(len(candidates), 1)
+        self.assertIn("'sunset'", candidates[0])
+
+    def test_rebuild_matches_incremental_index(self):
+        expected = sorted(Posting.objects.values_list(
+            'term', 'post', 'comment', 'weight', 'created'))
+        Posting.objects.all().delete()
+        rebuild_search_index()
+        self.assertEqual(sorted(Posting.objects.values_list(
+            'term', 'post', 'comment', 'weight', 'created')), expected)
@@ -0,0 +1,21 @@
+import re
+from collections import Counter
+
+
+TOKEN_PATTERN = re.compile(r'\w+')
+MIN_TERM_LENGTH = 2
+MAX_TERM_LENGTH = 64
+STOP_WORDS = frozenset((
+    'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is',
+    'it', 'of', 'on', 'or', 'that', 'the', 'this', 'to', 'was', 'with',
+))
+
+
+def tokenize(text):
+    return [term for term in TOKEN_PATTERN.findall((text or '').casefold())
+            if MIN_TERM_LENGTH <= len(term) <= MAX_TERM_LENGTH
+            and term not in STOP_WORDS]
+
+
+def count_terms(text):
+    return Counter(tokenize(text))
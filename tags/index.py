@@ -0,0 +1,204 @@
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import Tag
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_TIMEOUT = getattr(settings, 'TAG_INDEX_TIMEOUT', 300)
+SYNC_INTERVAL = getattr(settings, 'TAG_INDEX_SYNC_INTERVAL', 5)
+SYNC_OVERLAP = timedelta(
+    seconds=getattr(settings, 'TAG_INDEX_SYNC_OVERLAP', 30))
+CACHED_PREFIX_LENGTH = 2
+MAX_SUGGESTIONS = 50
+LAST_CHARACTER = chr(0x10ffff)
+
+
+def rank(keys, names, counts, key, limit):
+    start = bisect_left(keys, key)
+    end = bisect_left(keys, key + LAST_CHARACTER, start)
+    names = heapq.nlargest(limit, names[start:end], key=counts.__getitem__)
+    return [(name, counts[name]) for name in names]
+
+
+def warm_up(keys, names, counts):
+    top = {}
+    position = 0
+    while position < len(keys):
+        key = keys[position][:1]
+        top[key] = rank(keys, names, counts, key, MAX_SUGGESTIONS)
+        position = bisect_left(keys, key + LAST_CHARACTER, position)
+    return top
+
+
+def get_order(item):
+    name, count = item
+    return -count, name.casefold(), name
+
+
+def find_position(top, item):
+    order = get_order(item)
+    for position, other in enumerate(top):
+        if get_order(other) > order:
+            return position
+    return len(top)
+
+
+class TagIndex(object):
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.refresh_lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.keys = []
+            self.names = []
+            self.counts = {}
+            self.top = {}
+            self.loaded = None
+            self.synced = None
+            self.synced_to = None
+
+    def build(self, rows):
+        rows = sorted((name.casefold(), name, count) for name, count in rows)
+        keys = [key for key, _, _ in rows]
+        names = [name for _, name, _ in rows]
+        counts = {name: count for _, name, count in rows}
+        top = warm_up(keys, names, counts)
+        with self.lock:
+            self.keys, self.names, self.counts, self.top = (
+                keys, names, counts, top)
+            self.loaded = self.synced = time.monotonic()
+
+    def load(self):
+        # Changes made while the scan runs, here or on other workers, are
+        # replayed by syncing from the moment it started.
+        started = timezone.now()
+        self.build(Tag.objects.values_list(
+            'name', 'posts_count').iterator())
+        with self.lock:
+            self.synced_to = started
+        self.sync(force=True)
+
+    def sync(self, force=False):
+        if self.synced_to is None:
+            return
+        if not force and time.monotonic() - self.synced < SYNC_INTERVAL:
+            return
+        if not self.sync_lock.acquire(blocking=False):
+            return
+        try:
+            started = timezone.now()
+            rows = Tag.objects.filter(
+                updated__gte=self.synced_to - SYNC_OVERLAP).values_list(
+                'name', 'posts_count')
+            with self.lock:
+                for name, count in rows:
+                    self.set_count(name, count)
+                self.synced_to = started
+                self.synced = time.monotonic()
+        finally:
+            self.sync_lock.release()
+
+    def refresh(self):
+        try:
+            self.load()
+        except Exception:
+            logger.exception('Failed to reload the tag index')
+        finally:
+            connections.close_all()
+            self.refresh_lock.release()
+
+    def is_stale(self):
+        return time.monotonic() - self.loaded > INDEX_TIMEOUT
+
+    def ensure_loaded(self):
+        if self.loaded is None:
+            with self.refresh_lock:
+                if self.loaded is None:
+                    self.load()
+        elif self.is_stale() and self.refresh_lock.acquire(blocking=False):
+            threading.Thread(target=self.refresh, daemon=True).start()
+        else:
+            self.sync()
+
+    def search(self, prefix, limit):
+        key = prefix.casefold()
+        self.ensure_loaded()
+        with self.lock:
+            if len(key) > CACHED_PREFIX_LENGTH:
+                return self.rank(key, limit)
+            if key not in self.top:
+                self.top[key] = self.rank(key, MAX_SUGGESTIONS)
+            return self.top[key][:limit]
+
+    def rank(self, key, limit):
+        return rank(self.keys, self.names, self.counts, key, limit)
+
+    def add(self, names):
+        with self.lock:
+            if self.loaded is None:
+                return
+            for name in names:
+                if name not in self.counts:
+                    self.set_count(name, 0)
+
+    def adjust(self, names, delta):
+        with self.lock:
+            for name in names:
+                if name in self.counts:
+                    self.set_count(name, max(self.counts[name] + delta, 0))
+
+    def set_count(self, name, count):
+        key = name.casefold()
+        previous = self.counts.get(name)
+        if previous is None:
+            position = bisect_left(self.keys, key)
+            while (position < len(self.keys) and self.keys[position] == key
+                   and self.names[position] < name):
+                position += 1
+            self.keys.insert(position, key)
+            self.names.insert(position, name)
+        elif previous == count:
+            return
+        self.counts[name] = count
+        prefixes = {key[:length] for length in range(CACHED_PREFIX_LENGTH + 1)}
+        for prefix in prefixes:
+            self.update_top(prefix, name, count, previous)
+
+    def update_top(self, prefix, name, count, previous):
+        # The cached lists are patched in place. A full list is dropped only
+        # when one of its tags falls to the bottom, since a tag outside the
+        # list might now outrank it.
+        top = self.top.get(prefix)
+        if top is None:
+            return
+        item = (name, count)
+        full = len(top) >= MAX_SUGGESTIONS
+        if previous is not None and (name, previous) in top:
+            top.remove((name, previous))
+            position = find_position(top, item)
+            if full and previous > count and position == len(top):
+                del self.top[prefix]
+                return
+        else:
+            position = find_position(top, item)
+            if full and position == len(top):
+                return
+        top.insert(position, item)
+        del top[MAX_SUGGESTIONS:]
+
+
+tag_index = TagIndex()
@@ -0,0 +1,64 @@
+import json
+import random
+import string
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+
+from tags.index import TagIndex
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+class Command(BaseCommand):
+    help = 'Measures tag prefix lookup latency on a synthetic in-memory index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tags', type=int, default=1000000)
+        parser.add_argument('--lookups', type=int, default=10000)
+        parser.add_argument('--limit', type=int, default=10)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--during-rebuild', action='store_true',
+            help='Run the lookups while another thread rebuilds the index')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        alphabet = string.ascii_lowercase + string.digits
+        names = {''.join(rng.choices(alphabet, k=rng.randint(3, 12)))
+                 for _ in range(options['tags'])}
+        rows = [(name, int(rng.paretovariate(1.5))) for name in names]
+        index = TagIndex()
+        started = time.perf_counter()
+        index.build(rows)
+        build_time = time.perf_counter() - started
+
+        rebuild = None
+        if options['during_rebuild']:
+            rebuild = threading.Thread(target=index.build, args=(rows,))
+            rebuild.start()
+
+        durations = []
+        for _ in range(options['lookups']):
+            name = rng.choice(rows)[0]
+            prefix = name[:rng.randint(1, len(name))]
+            started = time.perf_counter()
+            index.search(prefix, options['limit'])
+            durations.append(time.perf_counter() - started)
+        rebuilding = rebuild is not None and rebuild.is_alive()
+        if rebuild is not None:
+            rebuild.join()
+
+        self.stdout.write(json.dumps({
+            'tags': len(rows),
+            'build_s': round(build_time, 3),
+            'during_rebuild': options['during_rebuild'],
+            'rebuild_outlasted_lookups': rebuilding,
+            'p50_ms': round(percentile(durations, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(durations, 0.99) * 1000, 3),
+            'max_ms': round(max(durations) * 1000, 3),
+        }, indent=2))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, TruncHour
+from django.utils import timezone
+
+from posts.models import Post
+from tags.models import Tag, TagUsage
+
+
+def rebuild_tag_usage():
+    post_tags = Post.tags.through.objects.order_by()
+    counts = post_tags.filter(tag=OuterRef('pk')).values('tag').annotate(
+        count=Count('pk')).values('count')
+    usage = post_tags.annotate(bucket=TruncHour(
+        'post__created', tzinfo=timezone.utc)).values(
+        'tag', 'bucket').annotate(count=Count('pk'))
+    with transaction.atomic():
+        updated = Tag.objects.update(posts_count=Coalesce(
+            Subquery(counts, output_field=IntegerField()), 0),
+            updated=timezone.now())
+        TagUsage.objects.all().delete()
+        TagUsage.objects.bulk_create(
+            (TagUsage(tag_id=row['tag'], bucket=row['bucket'],
+                      count=row['count']) for row in usage.iterator()),
+            batch_size=1000)
+    return updated
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds Tag.posts_count and the hourly tag usage buckets from post tags'
+
+    def handle(self, *args, **options):
+        updated = rebuild_tag_usage()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt usage for {updated} tags'))
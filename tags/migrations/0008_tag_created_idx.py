@@ -0,0 +1,17 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0007_alter_tag_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['-created', '-name'], name='tags_created_idx'),
+        ),
+    ]
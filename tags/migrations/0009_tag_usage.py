@@ -0,0 +1,49 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:33
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def fill_posts_count(apps, schema_editor):
+    Tag = apps.get_model('tags', 'Tag')
+    Post = apps.get_model('posts', 'Post')
+    counts = Post.tags.through.objects.filter(tag=OuterRef('pk')).order_by(
+        ).values('tag').annotate(count=Count('pk')).values('count')
+    Tag.objects.update(posts_count=Coalesce(
+        Subquery(counts, output_field=IntegerField()), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_created_idx'),
+        ('tags', '0008_tag_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='TagUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tag', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='tags.tag')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='tagusage',
+            index=models.Index(fields=['bucket'], name='tags_usage_bucket_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='tagusage',
+            unique_together={('tag', 'bucket')},
+        ),
+        migrations.RunPython(fill_posts_count, migrations.RunPython.noop),
+    ]
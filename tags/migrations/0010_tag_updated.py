@@ -0,0 +1,24 @@
+# Generated by Django 3.2.7 on 2026-10-18 21:05
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tags', '0009_tag_usage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tag',
+            name='updated',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['updated'], name='tags_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 3.2.7 on 2026-10-18 21:55
+
+from django.db import migrations
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+
+def seed_tag_usage(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    TagUsage = apps.get_model('tags', 'TagUsage')
+    usage = Post.tags.through.objects.order_by().annotate(bucket=TruncHour(
+        'post__created', tzinfo=timezone.utc)).values(
+        'tag', 'bucket').annotate(count=Count('pk'))
+    TagUsage.objects.all().delete()
+    TagUsage.objects.bulk_create(
+        (TagUsage(tag_id=row['tag'], bucket=row['bucket'], count=row['count'])
+         for row in usage.iterator()),
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_pulledauthor'),
+        ('tags', '0010_tag_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(seed_tag_usage, migrations.RunPython.noop),
+    ]
@@ -5,6 +5,31 @@ class Tag(models.Model):
     created = models.DateTimeField(auto_now_add=True)
     name = models.CharField(max_length=50,
                             unique=True, primary_key=True)
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-created', '-name'],
+                         name='tags_created_idx'),
+            models.Index(fields=['updated'], name='tags_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class TagUsage(models.Model):
+    tag = models.ForeignKey(
+        Tag, on_delete=models.CASCADE, related_name='usage')
+    bucket = models.DateTimeField()
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = (('tag', 'bucket'),)
+        indexes = [
+            models.Index(fields=['bucket'], name='tags_usage_bucket_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag} used {self.count} times from {self.bucket}'
@@ -0,0 +1,34 @@
+from django.db.models.signals import m2m_changed, pre_delete
+
+from posts.models import Post
+from .usage import add_tag_usage, remove_tag_usage
+
+
+def update_tag_usage(sender, instance, action, reverse, pk_set, **kw):
+    if action == 'pre_clear':
+        related = instance.post_set if reverse else instance.tags
+        instance._cleared_pks = set(related.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        action, pk_set = 'post_remove', instance._cleared_pks
+    if action not in ('post_add', 'post_remove') or not pk_set:
+        return
+    if reverse:
+        tag_names = [instance.pk]
+        created_times = Post.objects.filter(pk__in=pk_set).values_list(
+            'created', flat=True)
+    else:
+        tag_names, created_times = pk_set, [instance.created]
+    if action == 'post_add':
+        add_tag_usage(tag_names, created_times)
+    else:
+        remove_tag_usage(tag_names, created_times)
+
+
+def release_post_tags(sender, instance, **kw):
+    remove_tag_usage(instance.tags.values_list('pk', flat=True),
+                     [instance.created])
+
+
+m2m_changed.connect(update_tag_usage, sender=Post.tags.through)
+pre_delete.connect(release_post_tags, sender=Post)
@@ -1,3 +1,178 @@
-from django.test import TestCase
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from rest_framework.test import APITestCase
+
+from posts.models import Post
+from tags.index import INDEX_TIMEOUT, SYNC_INTERVAL, tag_index
+from tags.management.commands.rebuild_tag_usage import rebuild_tag_usage
+from tags.models import Tag, TagUsage
+from tags.usage import get_bucket
+
+
+class TagUsageTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        Tag.objects.bulk_create([Tag(name=name) for name in ('a', 'b', 'c')])
+        self.post = Post.objects.create(author=self.author)
+
+    def get_counts(self):
+        return dict(Tag.objects.values_list('name', 'posts_count'))
+
+    def test_counts_follow_post_tag_changes(self):
+        self.post.tags.set(['a', 'b'])
+        Post.objects.create(author=self.author).tags.add('a')
+        self.assertEqual(self.get_counts(), {'a': 2, 'b': 1, 'c': 0})
+        self.post.tags.set(['c'])
+        self.assertEqual(self.get_counts(), {'a': 1, 'b': 0, 'c': 1})
+        Tag.objects.get(name='a').post_set.clear()
+        self.post.delete()
+        self.assertEqual(self.get_counts(), {'a': 0, 'b': 0, 'c': 0})
+
+    def test_usage_is_bucketed_by_hour(self):
+        self.post.tags.set(['a', 'b'])
+        Post.objects.create(author=self.author).tags.add('a')
+        usage = dict(TagUsage.objects.filter(
+            bucket=get_bucket()).values_list('tag', 'count'))
+        self.assertEqual(usage, {'a': 2, 'b': 1})
+
+    def test_live_usage_matches_rebuilt_buckets(self):
+        old = Post.objects.create(author=self.author)
+        Post.objects.filter(pk=old.pk).update(
+            created=old.created - timedelta(days=3))
+        old.refresh_from_db()
+        old.tags.set(['a', 'b'])
+        self.post.tags.set(['a'])
+        Tag.objects.get(name='b').post_set.add(self.post)
+        old.tags.remove('b')
+
+        def get_usage():
+            return sorted(TagUsage.objects.filter(count__gt=0).values_list(
+                'tag', 'bucket', 'count'))
+
+        usage = get_usage()
+        self.assertIn(('a', get_bucket(old.created), 1), usage)
+        rebuild_tag_usage()
+        self.assertEqual(get_usage(), usage)
+
+    def test_rebuild_matches_signal_counts(self):
+        self.post.tags.set(['a', 'b'])
+        expected = self.get_counts()
+        Tag.objects.update(posts_count=0)
+        TagUsage.objects.all().delete()
+        rebuild_tag_usage()
+        self.assertEqual(self.get_counts(), expected)
+        self.assertEqual(TagUsage.objects.count(), 2)
+
+    def test_trending_ranks_by_growth(self):
+        now = get_bucket()
+        TagUsage.objects.bulk_create([
+            TagUsage(tag_id='a', bucket=now, count=10),
+            TagUsage(tag_id='a', bucket=now - timedelta(hours=30), count=9),
+            TagUsage(tag_id='b', bucket=now - timedelta(hours=2), count=5),
+            TagUsage(tag_id='c', bucket=now - timedelta(hours=30), count=7),
+        ])
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/tags/trending/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(tag['name'], tag['growth']) for tag in response.data],
+            [('b', 5), ('a', 1)])
+        response = self.client.get('/api/tags/trending/?hours=1&limit=1')
+        self.assertEqual(response.data[0]['name'], 'a')
+        self.assertEqual(len(response.data), 1)
+
+
+class TagAutocompleteTest(APITestCase):
+
+    def setUp(self):
+        self.author = User.objects.create(username='author')
+        self.client.force_authenticate(self.author)
+        tag_index.reset()
+        for tags in (['python', 'pycon'], ['python'], ['pyramid', 'rust']):
+            self.client.post('/api/posts/', {'tags': tags}, format='json')
+
+    def tearDown(self):
+        tag_index.reset()
+
+    def search(self, prefix, limit=10):
+        response = self.client.get('/api/tags/',
+                                   {'prefix': prefix, 'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        return [(tag['name'], tag['posts_count']) for tag in response.data]
+
+    def test_matches_are_ranked_by_usage(self):
+        self.assertEqual(self.search('py'),
+                         [('python', 2), ('pycon', 1), ('pyramid', 1)])
+        self.assertEqual(self.search('PYT'), [('python', 2)])
+        self.assertEqual(self.search('py', limit=1), [('python', 2)])
+        self.assertEqual(self.search('go'), [])
+
+    def test_new_tags_and_usage_update_the_index(self):
+        self.search('py')
+        self.client.post('/api/posts/', {'tags': ['pypy', 'pycon']},
+                         format='json')
+        self.client.post('/api/posts/', {'tags': ['pycon']}, format='json')
+        self.assertEqual(self.search('py')[:2], [('pycon', 3), ('python', 2)])
+        self.assertIn(('pypy', 1), self.search('pyp'))
+
+    def test_lookups_do_not_query_the_database(self):
+        self.search('p')
+        with self.assertNumQueries(0):
+            self.search('pyr')
+
+    def test_stale_index_is_reloaded_in_the_background(self):
+        self.search('py')
+        tag_index.loaded -= INDEX_TIMEOUT + 1
+        with mock.patch.object(tag_index, 'refresh') as refresh:
+            with self.assertNumQueries(0):
+                self.assertEqual(self.search('pyt'), [('python', 2)])
+        refresh.assert_called_once_with()
+        tag_index.refresh_lock.release()
+
+    def test_changes_during_a_reload_are_replayed(self):
+        self.search('py')
+        build = tag_index.build
+
+        def build_and_post(rows):
+            rows = list(rows)
+            self.client.post('/api/posts/', {'tags': ['pypy', 'python']},
+                             format='json')
+            build(rows)
+
+        with mock.patch.object(tag_index, 'build', build_and_post):
+            tag_index.load()
+        self.assertEqual(self.search('py'), [('python', 3), ('pycon', 1),
+                                             ('pypy', 1), ('pyramid', 1)])
+
+    def test_changes_from_other_workers_are_synced(self):
+        self.search('py')
+        Tag.objects.create(name='pyro')
+        Tag.objects.filter(name='pyro').update(posts_count=5)
+        self.assertEqual(self.search('py', limit=1), [('python', 2)])
+        tag_index.synced -= SYNC_INTERVAL + 1
+        self.assertEqual(self.search('py', limit=1), [('pyro', 5)])
+
+    def test_cached_top_lists_are_updated_in_place(self):
+        top = tag_index.search('p', 10)
+        self.assertEqual(tag_index.top['p'], top)
+        cached = tag_index.top['p']
+        self.client.post('/api/posts/', {'tags': ['pyramid', 'pypy']},
+                         format='json')
+        self.assertIs(tag_index.top['p'], cached)
+        self.assertEqual(self.search('p'), [('pyramid', 2), ('python', 2),
+                                            ('pycon', 1), ('pypy', 1)])
+
+    def test_full_top_lists_are_rebuilt_when_a_member_drops_out(self):
+        with mock.patch('tags.index.MAX_SUGGESTIONS', 2):
+            self.assertEqual(self.search('p', 2),
+                             [('python', 2), ('pycon', 1)])
+            tag_index.adjust(['pyramid'], 1)
+            self.assertEqual(self.search('p', 2),
+                             [('pyramid', 2), ('python', 2)])
+            tag_index.adjust(['python', 'pyramid'], -2)
+            self.assertNotIn('p', tag_index.top)
+            self.assertEqual(self.search('p', 2),
+                             [('pycon', 1), ('pyramid', 0)])
@@ -0,0 +1,51 @@
+from collections import Counter
+
+from django.db.models import F
+from django.utils import timezone
+
+from .index import tag_index
+from .models import Tag, TagUsage
+
+
+def get_bucket(moment=None):
+    moment = moment or timezone.now()
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def count_buckets(created_times):
+    return Counter(get_bucket(created) for created in created_times)
+
+
+def add_tag_usage(tag_names, created_times):
+    # Usage is bucketed by the time of the post, as rebuild_tag_usage does,
+    # so rebuilding the buckets leaves them unchanged.
+    tag_names = list(tag_names)
+    buckets = count_buckets(created_times)
+    if not tag_names or not buckets:
+        return
+    times = sum(buckets.values())
+    Tag.objects.filter(pk__in=tag_names).update(
+        posts_count=F('posts_count') + times, updated=timezone.now())
+    tag_index.adjust(tag_names, times)
+    TagUsage.objects.bulk_create(
+        [TagUsage(tag_id=name, bucket=bucket)
+         for name in tag_names for bucket in buckets],
+        ignore_conflicts=True)
+    for bucket, count in buckets.items():
+        TagUsage.objects.filter(tag__in=tag_names, bucket=bucket).update(
+            count=F('count') + count)
+
+
+def remove_tag_usage(tag_names, created_times):
+    tag_names = list(tag_names)
+    buckets = count_buckets(created_times)
+    if not tag_names or not buckets:
+        return
+    times = sum(buckets.values())
+    Tag.objects.filter(pk__in=tag_names, posts_count__gte=times).update(
+        posts_count=F('posts_count') - times, updated=timezone.now())
+    tag_index.adjust(tag_names, -times)
+    for bucket, count in buckets.items():
+        TagUsage.objects.filter(tag__in=tag_names, bucket=bucket,
+                                count__gte=count).update(
+            count=F('count') - count)
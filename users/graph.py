@@ -0,0 +1,245 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Max
+
+from .models import UserFollowing
+
+
+GRAPH_TIMEOUT = getattr(settings, 'FOLLOW_GRAPH_TIMEOUT', 600)
+MAX_OVERLAY_EDGES = getattr(settings, 'FOLLOW_GRAPH_MAX_OVERLAY_EDGES', 100000)
+
+
+def get_typecode(max_id):
+    return 'I' if max_id < 2 ** 32 else 'Q'
+
+
+def intersect(first, second):
+    if len(first) > len(second):
+        first, second = second, first
+    common = []
+    for node in first:
+        index = bisect_left(second, node)
+        if index < len(second) and second[index] == node:
+            common.append(node)
+    return common
+
+
+class Adjacency(object):
+
+    def __init__(self, edges, typecode):
+        self.nodes = array(typecode)
+        self.offsets = array('Q')
+        self.targets = array(typecode)
+        for source, target in edges:
+            if not self.nodes or self.nodes[-1] != source:
+                self.offsets.append(len(self.targets))
+                self.nodes.append(source)
+            self.targets.append(target)
+        self.offsets.append(len(self.targets))
+
+    def get_range(self, node):
+        index = bisect_left(self.nodes, node)
+        if index == len(self.nodes) or self.nodes[index] != node:
+            return 0, 0
+        return self.offsets[index], self.offsets[index + 1]
+
+    def neighbors(self, node):
+        start, end = self.get_range(node)
+        return self.targets[start:end]
+
+    def contains(self, node, target):
+        start, end = self.get_range(node)
+        index = bisect_left(self.targets, target, start, end)
+        return index < end and self.targets[index] == target
+
+    @property
+    def nbytes(self):
+        return sum(values.itemsize * len(values)
+                   for values in (self.nodes, self.offsets, self.targets))
+
+
+class FollowGraph(object):
+
+    def __init__(self, following, followers):
+        self.following = following
+        self.followers = followers
+        self.added_following = defaultdict(set)
+        self.added_followers = defaultdict(set)
+        self.removed = set()
+        self.removed_users = set()
+        self.overlay_edges = 0
+        self.lock = threading.Lock()
+        self.built = time.monotonic()
+
+    @classmethod
+    def from_edges(cls, edges):
+        edges = sorted(edges)
+        typecode = get_typecode(max((max(edge) for edge in edges), default=0))
+        return cls(Adjacency(edges, typecode),
+                   Adjacency(sorted((v, u) for u, v in edges), typecode))
+
+    @classmethod
+    def load(cls):
+        followings = UserFollowing.objects.values_list(
+            'user', 'following_user')
+        max_ids = followings.aggregate(
+            user=Max('user'), following_user=Max('following_user'))
+        typecode = get_typecode(max(
+            max_ids['user'] or 0, max_ids['following_user'] or 0))
+        following = Adjacency(followings.order_by(
+            'user', 'following_user').iterator(chunk_size=10000), typecode)
+        followers = Adjacency(followings.order_by(
+            'following_user', 'user').values_list(
+            'following_user', 'user').iterator(chunk_size=10000), typecode)
+        return cls(following, followers)
+
+    @property
+    def edges(self):
+        return len(self.following.targets)
+
+    @property
+    def nbytes(self):
+        return self.following.nbytes + self.followers.nbytes
+
+    def is_stale(self):
+        return (time.monotonic() - self.built > GRAPH_TIMEOUT
+                or self.overlay_edges > MAX_OVERLAY_EDGES)
+
+    def add_edge(self, user_id, following_id):
+        with self.lock:
+            self.overlay_edges += 1
+            self.removed.discard((user_id, following_id))
+            if not self.following.contains(user_id, following_id):
+                self.added_following[user_id].add(following_id)
+                self.added_followers[following_id].add(user_id)
+
+    def remove_edge(self, user_id, following_id):
+        with self.lock:
+            self.overlay_edges += 1
+            self.added_following[user_id].discard(following_id)
+            self.added_followers[following_id].discard(user_id)
+            if self.following.contains(user_id, following_id):
+                self.removed.add((user_id, following_id))
+
+    def remove_user(self, user_id):
+        with self.lock:
+            self.overlay_edges += 1
+            self.removed_users.add(user_id)
+            self.added_following.pop(user_id, None)
+            self.added_followers.pop(user_id, None)
+
+    def is_following(self, user_id, following_id):
+        if {user_id, following_id} & self.removed_users:
+            return False
+        if following_id in self.added_following.get(user_id, ()):
+            return True
+        if (user_id, following_id) in self.removed:
+            return False
+        return self.following.contains(user_id, following_id)
+
+    def get_following(self, user_id):
+        following = [node for node in self.following.neighbors(user_id)
+                     if (user_id, node) not in self.removed]
+        return self.apply_added(following, self.added_following.get(user_id))
+
+    def get_followers(self, user_id):
+        followers = [node for node in self.followers.neighbors(user_id)
+                     if (node, user_id) not in self.removed]
+        return self.apply_added(followers, self.added_followers.get(user_id))
+
+    def apply_added(self, nodes, added):
+        if added:
+            with self.lock:
+                added = set(added)
+            nodes = sorted(added.union(nodes))
+        if self.removed_users:
+            nodes = [node for node in nodes if node not in self.removed_users]
+        return nodes
+
+    def get_followed_by(self, user_id, other_id):
+        return intersect(self.get_following(user_id),
+                         self.get_followers(other_id))
+
+    def get_common_followers(self, user_id, other_id):
+        return intersect(self.get_followers(user_id),
+                         self.get_followers(other_id))
+
+
+_graph = None
+_graph_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_pending = None
+
+logger = logging.getLogger(__name__)
+
+
+def load_follow_graph():
+    # Edges recorded while the graph loads may be missing from the scan, so
+    # they are replayed onto the new graph before it replaces the old one.
+    global _graph, _pending
+    with _graph_lock:
+        _pending = []
+    graph = FollowGraph.load()
+    with _graph_lock:
+        for edge_change, args in _pending:
+            edge_change(graph, *args)
+        _pending = None
+        _graph = graph
+    return graph
+
+
+def refresh_follow_graph():
+    try:
+        load_follow_graph()
+    except Exception:
+        logger.exception('Failed to reload the follow graph')
+    finally:
+        connections.close_all()
+        _refresh_lock.release()
+
+
+def warm_follow_graph():
+    if _refresh_lock.acquire(blocking=False):
+        threading.Thread(target=refresh_follow_graph, daemon=True).start()
+
+
+def get_follow_graph():
+    # Never loads inside the request: until the first background load is
+    # done callers get None and answer from the database instead.
+    graph = _graph
+    if graph is None or graph.is_stale():
+        warm_follow_graph()
+    return graph
+
+
+def reset_follow_graph():
+    global _graph
+    _graph = None
+
+
+def record_edge_change(edge_change, *args):
+    with _graph_lock:
+        if _pending is not None:
+            _pending.append((edge_change, args))
+        graph = _graph
+    if graph is not None:
+        edge_change(graph, *args)
+
+
+def record_follow(user_id, following_id):
+    record_edge_change(FollowGraph.add_edge, user_id, following_id)
+
+
+def record_unfollow(user_id, following_id):
+    record_edge_change(FollowGraph.remove_edge, user_id, following_id)
+
+
+def record_user_removal(user_id):
+    record_edge_change(FollowGraph.remove_user, user_id)
@@ -0,0 +1,67 @@
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Profile
+
+
+USER_FIELDS = ('username', 'email', 'first_name', 'last_name')
+PROFILE_FIELDS = ('description', 'privacy')
+BATCH_SIZE = 1000
+
+
+def is_password_hash(value):
+    try:
+        identify_hasher(value)
+    except ValueError:
+        return False
+    return True
+
+
+def validate_record(record):
+    if not record.get('username'):
+        raise ValueError('username is required')
+    if record.get('password') and not is_password_hash(record['password']):
+        raise ValueError(f'{record["username"]}: password is not a '
+                         f'recognized password hash')
+
+
+def build_user(record):
+    user = User(**{field: record.get(field, '') for field in USER_FIELDS})
+    if record.get('password'):
+        user.password = record['password']
+    elif record.get('raw_password'):
+        user.password = make_password(record['raw_password'])
+    else:
+        user.set_unusable_password()
+    return user
+
+
+def build_profile(user_id, record):
+    return Profile(user_id=user_id, **{field: record[field]
+                                       for field in PROFILE_FIELDS
+                                       if record.get(field)})
+
+
+def bulk_create_users(records, batch_size=BATCH_SIZE):
+    # Two inserts per batch. `password` must already be a hash, while
+    # `raw_password` is hashed here. Existing usernames are skipped.
+    records = list(records)
+    for record in records:
+        validate_record(record)
+    records = {record['username']: record for record in records}
+    existing = set(User.objects.filter(
+        username__in=list(records)).values_list('username', flat=True))
+    records = {username: record for username, record in records.items()
+               if username not in existing}
+    with transaction.atomic():
+        User.objects.bulk_create(
+            [build_user(record) for record in records.values()],
+            batch_size=batch_size)
+        user_ids = User.objects.filter(
+            username__in=list(records)).values_list('username', 'pk')
+        Profile.objects.bulk_create(
+            [build_profile(user_id, records[username])
+             for username, user_id in user_ids],
+            batch_size=batch_size)
+    return len(records)
@@ -0,0 +1,70 @@
+import json
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from users.models import RevokedToken
+from users.revocation import FILTER_ERROR_RATE, RevocationFilter
+
+
+class Command(BaseCommand):
+    help = 'Measures the false-positive rate and lookup cost of the token revocation filter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--revoked', type=int, default=100000)
+        parser.add_argument('--lookups', type=int, default=100000)
+        parser.add_argument('--db-lookups', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        revoked = [uuid.uuid4().hex for _ in range(options['revoked'])]
+        valid = [uuid.uuid4().hex for _ in range(options['lookups'])]
+
+        started = time.perf_counter()
+        revocation_filter = RevocationFilter(enumerate(revoked, 1))
+        build_time = time.perf_counter() - started
+        bloom = revocation_filter.bloom
+
+        started = time.perf_counter()
+        false_positives = sum(jti in bloom for jti in valid)
+        filter_time = time.perf_counter() - started
+        missed = sum(jti not in bloom for jti in revoked)
+
+        with transaction.atomic():
+            expires = timezone.now() + timedelta(days=1)
+            RevokedToken.objects.bulk_create(
+                (RevokedToken(jti=jti, expires=expires) for jti in revoked),
+                batch_size=1000)
+            db_lookups = valid[:options['db_lookups']]
+            started = time.perf_counter()
+            for jti in db_lookups:
+                RevokedToken.objects.filter(jti=jti).exists()
+            db_time = time.perf_counter() - started
+            loaded = RevocationFilter.load()
+            started = time.perf_counter()
+            for _ in db_lookups:
+                loaded.sync()
+            sync_time = time.perf_counter() - started
+            transaction.set_rollback(True)
+
+        filter_us = filter_time / len(valid) * 1000000
+        db_us = db_time / max(len(db_lookups), 1) * 1000000
+        sync_us = sync_time / max(len(db_lookups), 1) * 1000000
+        false_positive_rate = false_positives / len(valid)
+        self.stdout.write(json.dumps({
+            'revoked': len(revoked),
+            'filter_bytes': bloom.nbytes,
+            'filter_hashes': bloom.hashes,
+            'build_s': round(build_time, 3),
+            'target_error_rate': FILTER_ERROR_RATE,
+            'false_positive_rate': round(false_positive_rate, 5),
+            'false_negatives': missed,
+            'filter_lookup_us': round(filter_us, 3),
+            'db_lookup_us': round(db_us, 3),
+            'sync_us': round(sync_us, 3),
+            'expected_check_us': round(
+                sync_us + filter_us + false_positive_rate * db_us, 3),
+        }, indent=2))
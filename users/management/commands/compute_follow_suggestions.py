@@ -0,0 +1,56 @@
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.models import FollowSuggestion
+from users.suggestions import compute_suggestions
+
+
+def iterate_user_chunks(chunk_size):
+    last_pk = 0
+    while True:
+        user_ids = list(User.objects.filter(pk__gt=last_pk).order_by(
+            'pk').values_list('pk', flat=True)[:chunk_size])
+        if not user_ids:
+            return
+        yield user_ids
+        last_pk = user_ids[-1]
+
+
+def save_suggestions(suggestions):
+    with transaction.atomic():
+        FollowSuggestion.objects.filter(user__in=list(suggestions)).delete()
+        created = FollowSuggestion.objects.bulk_create(
+            [FollowSuggestion(user_id=user_id, suggested_user_id=suggested_id,
+                              score=score)
+             for user_id, scored in suggestions.items()
+             for score, suggested_id in scored], batch_size=1000)
+    return len(created)
+
+
+class Command(BaseCommand):
+    help = 'Computes friend-of-friend and co-follower suggestions for every user'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--limit', type=int, default=20)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        users = edges = saved = 0
+        for user_ids in iterate_user_chunks(options['chunk_size']):
+            chunk_edges, suggestions = compute_suggestions(
+                user_ids, options['limit'])
+            saved += save_suggestions(suggestions)
+            users += len(user_ids)
+            edges += chunk_edges
+            if options['verbosity'] > 1:
+                self.stdout.write(
+                    f'{users} users, {edges} edges, '
+                    f'{time.perf_counter() - started:.1f}s')
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Saved {saved} suggestions for {users} users in {elapsed:.1f}s '
+            f'({users / elapsed:.0f} users/s, {edges / elapsed:.0f} edges/s)'))
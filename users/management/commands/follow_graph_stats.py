@@ -0,0 +1,53 @@
+import json
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.graph import FollowGraph
+
+
+class Command(BaseCommand):
+    help = 'Reports build time, memory footprint and lookup cost of the follow graph index'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--synthetic-edges', type=int,
+                            help='Build from random edges instead of the database')
+        parser.add_argument('--users', type=int, default=100000)
+        parser.add_argument('--lookups', type=int, default=10000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        started = time.perf_counter()
+        if options['synthetic_edges']:
+            users = options['users']
+            graph = FollowGraph.from_edges({
+                (rng.randrange(1, users), rng.randrange(1, users))
+                for _ in range(options['synthetic_edges'])})
+        else:
+            graph = FollowGraph.load()
+        build_time = time.perf_counter() - started
+
+        nodes = list(graph.following.nodes) or [0]
+        started = time.perf_counter()
+        for _ in range(options['lookups']):
+            graph.is_following(rng.choice(nodes), rng.choice(nodes))
+        lookup_time = time.perf_counter() - started
+        started = time.perf_counter()
+        for _ in range(options['lookups']):
+            graph.get_followed_by(rng.choice(nodes), rng.choice(nodes))
+        mutuals_time = time.perf_counter() - started
+
+        edges = graph.edges
+        self.stdout.write(json.dumps({
+            'edges': edges,
+            'build_s': round(build_time, 3),
+            'bytes': graph.nbytes,
+            'mb_per_million_edges': round(
+                graph.nbytes / max(edges, 1) * 1000000 / 2 ** 20, 2),
+            'is_following_us': round(
+                lookup_time / options['lookups'] * 1000000, 2),
+            'followed_by_us': round(
+                mutuals_time / options['lookups'] * 1000000, 2),
+        }, indent=2))
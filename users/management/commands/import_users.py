@@ -0,0 +1,50 @@
+import json
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.importing import BATCH_SIZE, bulk_create_users, is_password_hash
+
+
+def read_records(lines):
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as error:
+            raise CommandError(f'Line {number}: {error}')
+        if not record.get('username'):
+            raise CommandError(f'Line {number}: username is required')
+        if record.get('password') and not is_password_hash(record['password']):
+            raise CommandError(
+                f'Line {number}: password is not a recognized password '
+                f'hash, use raw_password for plaintext passwords')
+        yield record
+
+
+class Command(BaseCommand):
+    help = 'Imports users and profiles in bulk from a JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='JSON Lines file, or - for stdin')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        lines = sys.stdin if options['path'] == '-' else open(
+            options['path'], encoding='utf-8')
+        started = time.perf_counter()
+        created = 0
+        with lines:
+            records = read_records(lines)
+            while True:
+                batch = list(islice(records, options['batch_size']))
+                if not batch:
+                    break
+                created += bulk_create_users(batch, options['batch_size'])
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {created} users in {elapsed:.1f}s '
+            f'({created / elapsed:.0f} users/s)'))
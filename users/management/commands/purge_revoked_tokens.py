@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from users.revocation import BATCH_SIZE, purge_revoked_tokens
+
+
+class Command(BaseCommand):
+    help = 'Deletes revoked refresh tokens that have expired anyway'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        purged = purge_revoked_tokens(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {purged} expired revoked tokens'))
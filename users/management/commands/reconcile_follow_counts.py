@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from users.models import Profile, UserFollowing
+
+
+BATCH_SIZE = 1000
+
+
+def count_followings(field):
+    counts = UserFollowing.objects.filter(**{field: OuterRef('user')}).order_by(
+        ).values(field).annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def find_drifted_profiles():
+    return Profile.objects.annotate(
+        actual_followers=count_followings('following_user'),
+        actual_following=count_followings('user'),
+    ).filter(~Q(followers_count=F('actual_followers'))
+             | ~Q(following_count=F('actual_following')))
+
+
+def reconcile_follow_counts(dry_run=False):
+    drifted = list(find_drifted_profiles().values_list('pk', flat=True))
+    if not dry_run:
+        for start in range(0, len(drifted), BATCH_SIZE):
+            Profile.objects.filter(
+                pk__in=drifted[start:start + BATCH_SIZE]).update(
+                followers_count=count_followings('following_user'),
+                following_count=count_followings('user'))
+    return len(drifted)
+
+
+class Command(BaseCommand):
+    help = 'Repairs Profile.followers_count and Profile.following_count that drifted from the followings table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        drifted = reconcile_follow_counts(options['dry_run'])
+        action = 'Found' if options['dry_run'] else 'Repaired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{action} {drifted} profiles with drifted follow counts'))
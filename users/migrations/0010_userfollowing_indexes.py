@@ -0,0 +1,21 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_alter_userfollowing_unique_together'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userfollowing',
+            index=models.Index(fields=['following_user', '-create', '-id'], name='users_followers_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='userfollowing',
+            index=models.Index(fields=['user', '-create', '-id'], name='users_following_idx'),
+        ),
+    ]
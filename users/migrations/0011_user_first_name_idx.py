@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+FIRST_NAME_INDEX = models.Index(
+    fields=['first_name'], name='users_first_name_idx')
+
+
+def add_first_name_index(apps, schema_editor):
+    schema_editor.add_index(apps.get_model('auth', 'User'), FIRST_NAME_INDEX)
+
+
+def remove_first_name_index(apps, schema_editor):
+    schema_editor.remove_index(
+        apps.get_model('auth', 'User'), FIRST_NAME_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0010_userfollowing_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_first_name_index, remove_first_name_index),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 3.2.7 on 2026-10-18 19:39
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_follow_counts(apps, schema_editor):
+    Profile = apps.get_model('users', 'Profile')
+    UserFollowing = apps.get_model('users', 'UserFollowing')
+
+    def count_followings(field):
+        counts = UserFollowing.objects.filter(
+            **{field: OuterRef('user')}).order_by().values(field).annotate(
+            count=Count('pk')).values('count')
+        return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+    Profile.objects.update(followers_count=count_followings('following_user'),
+                           following_count=count_followings('user'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_first_name_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='profile',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['followers_count'], name='users_followers_count_idx'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
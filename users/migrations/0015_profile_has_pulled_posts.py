@@ -0,0 +1,33 @@
+# Generated by Django 3.2.7 on 2026-10-18 22:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def mark_pulled_authors(apps, schema_editor):
+    threshold = getattr(settings, 'FEED_FANOUT_THRESHOLD', None)
+    if threshold is None:
+        return
+    Profile = apps.get_model('users', 'Profile')
+    Profile.objects.filter(followers_count__gte=threshold).update(
+        has_pulled_posts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0014_revokedtoken'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='has_pulled_posts',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='profile',
+            index=models.Index(fields=['has_pulled_posts'], name='users_has_pulled_posts_idx'),
+        ),
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
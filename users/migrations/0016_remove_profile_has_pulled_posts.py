@@ -0,0 +1,22 @@
+# Generated by Django 3.2.7 on 2026-10-18 20:28
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_pulledauthor'),
+        ('users', '0015_profile_has_pulled_posts'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='profile',
+            name='users_has_pulled_posts_idx',
+        ),
+        migrations.RemoveField(
+            model_name='profile',
+            name='has_pulled_posts',
+        ),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.dispatch import Signal
 from django.contrib.auth.models import User
 
 import os
@@ -26,6 +27,14 @@ class Profile(models.Model):
         blank=True, null=True, upload_to=get_user_image_path, default='default-images/default.jpg')
     privacy = models.CharField(
         max_length=4, choices=PRIVACY_CHOICES, default=PUBLIC)
+    followers_count = models.PositiveIntegerField(default=0, editable=False)
+    following_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['followers_count'],
+                         name='users_followers_count_idx'),
+        ]
 
     def __str__(self):
         return str(self.user)
@@ -41,6 +50,11 @@ class Profile(models.Model):
         return url
 
 
+# Sent by UserFollowing.delete() rather than post_delete, which would make
+# every cascade through UserFollowing delete its rows one at a time.
+unfollowed = Signal()
+
+
 class UserFollowing(models.Model):
     user = models.ForeignKey(
         User, related_name='following', on_delete=models.CASCADE)
@@ -50,6 +64,46 @@ class UserFollowing(models.Model):
 
     class Meta:
         unique_together = (('user', 'following_user'),)
+        indexes = [
+            models.Index(fields=['following_user', '-create', '-id'],
+                         name='users_followers_idx'),
+            models.Index(fields=['user', '-create', '-id'],
+                         name='users_following_idx'),
+        ]
 
     def __str__(self):
         return f'{self.user} following {self.following_user}'
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            deleted = super(UserFollowing, self).delete(*args, **kwargs)
+            unfollowed.send(sender=UserFollowing, instance=self)
+        return deleted
+
+
+class FollowSuggestion(models.Model):
+    user = models.ForeignKey(
+        User, related_name='suggestions', on_delete=models.CASCADE)
+    suggested_user = models.ForeignKey(
+        User, related_name='+', on_delete=models.CASCADE)
+    score = models.PositiveIntegerField()
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        unique_together = (('user', 'suggested_user'),)
+        indexes = [
+            models.Index(fields=['user', '-score', '-id'],
+                         name='users_suggestions_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.suggested_user} suggested to {self.user}'
+
+
+class RevokedToken(models.Model):
+    jti = models.CharField(max_length=255, unique=True)
+    expires = models.DateTimeField(db_index=True)
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.jti} revoked until {self.expires}'
@@ -0,0 +1,129 @@
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.utils import timezone
+
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+
+FILTER_TIMEOUT = getattr(settings, 'REVOCATION_FILTER_TIMEOUT', 60)
+FILTER_ERROR_RATE = getattr(settings, 'REVOCATION_FILTER_ERROR_RATE', 0.01)
+SYNC_INTERVAL = getattr(settings, 'REVOCATION_SYNC_INTERVAL', 0)
+FILTER_MIN_CAPACITY = 1000
+BATCH_SIZE = 1000
+
+
+class BloomFilter(object):
+
+    def __init__(self, capacity, error_rate):
+        capacity = max(capacity, 1)
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def get_positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + index * second) % self.size
+                for index in range(self.hashes))
+
+    def add(self, key):
+        for position in self.get_positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7))
+                   for position in self.get_positions(key))
+
+    @property
+    def nbytes(self):
+        return len(self.bits)
+
+
+class RevocationFilter(object):
+
+    def __init__(self, tokens):
+        tokens = list(tokens)
+        self.bloom = BloomFilter(
+            max(2 * len(tokens), FILTER_MIN_CAPACITY), FILTER_ERROR_RATE)
+        self.last_id = 0
+        self.synced = None
+        self.lock = threading.Lock()
+        self.add(tokens)
+        self.built = time.monotonic()
+
+    @classmethod
+    def load(cls):
+        tokens = RevokedToken.objects.filter(
+            expires__gt=timezone.now()).values_list('pk', 'jti')
+        return cls(tokens.iterator())
+
+    def add(self, tokens):
+        with self.lock:
+            for pk, jti in tokens:
+                self.bloom.add(jti)
+                self.last_id = max(self.last_id, pk)
+
+    def sync(self):
+        # Tokens revoked by any worker are read by primary key range, so with
+        # the default interval of 0 a revocation applies everywhere at once.
+        if (self.synced is not None
+                and time.monotonic() - self.synced < SYNC_INTERVAL):
+            return
+        self.synced = time.monotonic()
+        self.add(RevokedToken.objects.filter(
+            pk__gt=self.last_id).values_list('pk', 'jti'))
+
+    def is_stale(self):
+        return time.monotonic() - self.built > FILTER_TIMEOUT
+
+
+_filter = None
+_filter_lock = threading.Lock()
+
+
+def get_revocation_filter():
+    global _filter
+    revocation_filter = _filter
+    if revocation_filter is None or revocation_filter.is_stale():
+        with _filter_lock:
+            if _filter is None or _filter.is_stale():
+                _filter = RevocationFilter.load()
+            revocation_filter = _filter
+    return revocation_filter
+
+
+def reset_revocation_filter():
+    global _filter
+    _filter = None
+
+
+def is_revoked(jti):
+    revocation_filter = get_revocation_filter()
+    revocation_filter.sync()
+    if jti not in revocation_filter.bloom:
+        return False
+    return RevokedToken.objects.filter(jti=jti).exists()
+
+
+def revoke_token(token):
+    revoked, _ = RevokedToken.objects.get_or_create(
+        jti=token['jti'], defaults={'expires': datetime_from_epoch(token['exp'])})
+    if _filter is not None:
+        _filter.bloom.add(revoked.jti)
+
+
+def purge_revoked_tokens(batch_size=BATCH_SIZE):
+    expired = RevokedToken.objects.filter(expires__lte=timezone.now())
+    purged = 0
+    while True:
+        pks = list(expired.values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return purged
+        purged += RevokedToken.objects.filter(pk__in=pks).delete()[0]
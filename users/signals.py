@@ -1,15 +1,63 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, pre_delete
 
 from django.contrib.auth.models import User
-from .models import Profile
+from .graph import record_follow, record_unfollow, record_user_removal
+from .models import Profile, UserFollowing, unfollowed
 
 
 def create_profile(sender, instance, created, **kw):
+    # Callers that build the profile themselves attach it before saving.
+    if created and not User.profile.is_cached(instance):
+        instance.profile = Profile.objects.create(user=instance)
+
+
+def increment_follow_counts(sender, instance, created, **kw):
+    if created:
+        Profile.objects.filter(user=instance.following_user_id).update(
+            followers_count=F('followers_count') + 1)
+        Profile.objects.filter(user=instance.user_id).update(
+            following_count=F('following_count') + 1)
+
+
+def decrement_follow_counts(sender, instance, **kw):
+    Profile.objects.filter(user=instance.following_user_id,
+                           followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1)
+    Profile.objects.filter(user=instance.user_id,
+                           following_count__gt=0).update(
+        following_count=F('following_count') - 1)
+
+
+def release_user_followings(sender, instance, **kw):
+    # The account's followings cascade in bulk, so the counters on the
+    # other side of each edge and the graph are updated here in one go.
+    Profile.objects.filter(user__followers__user=instance,
+                           followers_count__gt=0).update(
+        followers_count=F('followers_count') - 1)
+    Profile.objects.filter(user__following__following_user=instance,
+                           following_count__gt=0).update(
+        following_count=F('following_count') - 1)
+    transaction.on_commit(partial(record_user_removal, instance.pk))
+
+
+def add_graph_edge(sender, instance, created, **kw):
     if created:
-        user = instance
-        profile = Profile.objects.create(
-            user=user,
-        )
+        transaction.on_commit(partial(
+            record_follow, instance.user_id, instance.following_user_id))
+
+
+def remove_graph_edge(sender, instance, **kw):
+    transaction.on_commit(partial(
+        record_unfollow, instance.user_id, instance.following_user_id))
 
 
 post_save.connect(create_profile, sender=User)
+post_save.connect(increment_follow_counts, sender=UserFollowing)
+unfollowed.connect(decrement_follow_counts, sender=UserFollowing)
+post_save.connect(add_graph_edge, sender=UserFollowing)
+unfollowed.connect(remove_graph_edge, sender=UserFollowing)
+pre_delete.connect(release_user_followings, sender=User)
@@ -0,0 +1,88 @@
+from collections import Counter, defaultdict
+import heapq
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import UserFollowing
+
+
+FRIEND_OF_FRIEND_WEIGHT = 2
+CO_FOLLOWER_WEIGHT = 1
+MAX_NEIGHBORS = getattr(settings, 'SUGGESTIONS_MAX_NEIGHBORS', 500)
+MAX_CANDIDATES = getattr(settings, 'SUGGESTIONS_MAX_CANDIDATES', 1000)
+NEIGHBORS_BATCH_SIZE = 1000
+EDGES_CHUNK_SIZE = 5000
+
+
+def iterate_edges(field, user_ids, other_field):
+    # ROW_NUMBER() caps every user at MAX_NEIGHBORS edges in the database,
+    # so high-degree users never send their whole neighborhood over.
+    edges = UserFollowing.objects.filter(**{f'{field}__in': user_ids}).annotate(
+        edge_number=Window(RowNumber(), partition_by=[F(field)],
+                           order_by=F('pk').asc()),
+    ).values_list(field, other_field, 'edge_number')
+    sql, params = edges.query.sql_with_params()
+    with connections[edges.db].cursor() as cursor:
+        cursor.execute(
+            f'SELECT * FROM ({sql}) AS edges WHERE edge_number <= %s',
+            (*params, MAX_NEIGHBORS))
+        while True:
+            rows = cursor.fetchmany(EDGES_CHUNK_SIZE)
+            if not rows:
+                break
+            for user_id, neighbor_id, _ in rows:
+                yield user_id, neighbor_id
+
+
+def group_neighbors(edges):
+    neighbors = defaultdict(list)
+    for user_id, neighbor_id in edges:
+        neighbors[user_id].append(neighbor_id)
+    return neighbors
+
+
+def compute_suggestions(user_ids, limit):
+    # Returns the number of edges read and the top (score, user id) pairs.
+    # Each user keeps at most twice MAX_CANDIDATES scored candidates, so a
+    # chunk's memory is bounded by its size whatever the degrees.
+    followings = group_neighbors(
+        iterate_edges('user', user_ids, 'following_user'))
+    followers = group_neighbors(
+        iterate_edges('following_user', user_ids, 'user'))
+    edges = sum(map(len, followings.values())) + sum(
+        map(len, followers.values()))
+
+    sources = defaultdict(list)
+    for user_id, neighbor_ids in followings.items():
+        for neighbor_id in neighbor_ids:
+            sources[neighbor_id].append((user_id, FRIEND_OF_FRIEND_WEIGHT))
+    for user_id, neighbor_ids in followers.items():
+        for neighbor_id in neighbor_ids:
+            sources[neighbor_id].append((user_id, CO_FOLLOWER_WEIGHT))
+
+    max_candidates = max(MAX_CANDIDATES, limit)
+    scores = defaultdict(Counter)
+    middle_ids = list(sources)
+    for start in range(0, len(middle_ids), NEIGHBORS_BATCH_SIZE):
+        batch = middle_ids[start:start + NEIGHBORS_BATCH_SIZE]
+        for middle_id, candidate_id in iterate_edges(
+                'user', batch, 'following_user'):
+            edges += 1
+            for user_id, weight in sources[middle_id]:
+                candidates = scores[user_id]
+                candidates[candidate_id] += weight
+                if len(candidates) >= 2 * max_candidates:
+                    scores[user_id] = Counter(
+                        dict(candidates.most_common(max_candidates)))
+
+    suggestions = {}
+    for user_id in user_ids:
+        followed = set(followings.get(user_id, ()))
+        candidates = ((score, candidate_id) for candidate_id, score
+                      in scores.pop(user_id, {}).items()
+                      if candidate_id != user_id and candidate_id not in followed)
+        suggestions[user_id] = heapq.nlargest(limit, candidates)
+    return edges, suggestions
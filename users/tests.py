@@ -1,3 +1,379 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITestCase
+
+from users import graph
+from users.graph import (
+    GRAPH_TIMEOUT,
+    FollowGraph,
+    get_follow_graph,
+    load_follow_graph,
+    reset_follow_graph,
+)
+from users.importing import bulk_create_users
+from users.suggestions import compute_suggestions
+from users.management.commands.reconcile_follow_counts import reconcile_follow_counts
+from users.models import Profile, UserFollowing
+
+
+class FollowerEndpointsQueryCountTest(APITestCase):
+
+    def setUp(self):
+        self.user = User.objects.create(username='user')
+        self.follower = User.objects.create(username='follower')
+        UserFollowing.objects.create(
+            user=self.follower, following_user=self.user)
+
+    def test_user_follower_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/user/followers/follower/')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_follower_detail_of_unknown_user_is_not_found(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/nobody/followers/follower/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_user_following_detail(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/follower/following/user')
+        self.assertEqual(response.status_code, 200)
+
+    def test_user_followers_list(self):
+        for index in range(5):
+            follower = User.objects.create(username=f'follower{index}')
+            UserFollowing.objects.create(
+                user=follower, following_user=self.user)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/user/followers/')
+        self.assertEqual(len(response.data['results']), 6)
+
+    def test_user_following_list(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/follower/following/')
+        self.assertEqual(response.data['results'],
+                         [{'following_user': 'user'}])
+
+
+class UsersListTest(APITestCase):
+
+    def setUp(self):
+        for username, first_name in (('ann', 'Ann'), ('anna', 'Zoe'),
+                                     ('bob', 'annie'), ('carl', 'Carl')):
+            User.objects.create(username=username, first_name=first_name)
+
+    def get_usernames(self, params):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/users/', params)
+        self.assertEqual(response.status_code, 200)
+        return [user['username'] for user in response.data['results']]
+
+    def test_users_are_paginated_by_username(self):
+        self.assertEqual(self.get_usernames({}),
+                         ['ann', 'anna', 'bob', 'carl'])
+        response = self.client.get('/api/users/', {'limit': 2})
+        self.assertEqual([user['username'] for user in response.data['results']],
+                         ['ann', 'anna'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([user['username'] for user in response.data['results']],
+                         ['bob', 'carl'])
+
+    def test_prefix_search_matches_username_or_first_name(self):
+        self.assertEqual(self.get_usernames({'q': 'ann'}),
+                         ['ann', 'anna', 'bob'])
+        self.assertEqual(self.get_usernames({'q': 'Ca'}), ['carl'])
+        self.assertEqual(self.get_usernames({'q': 'x'}), [])
+
+
+class FollowCountsTest(APITestCase):
+
+    def setUp(self):
+        self.users = [User.objects.create(username=f'user{index}')
+                      for index in range(3)]
+
+    def get_counts(self, user):
+        response = self.client.get(f'/api/users/{user.username}/')
+        return response.data['followers_count'], response.data['following_count']
+
+    def test_counts_follow_followings(self):
+        first, second, third = self.users
+        UserFollowing.objects.create(user=second, following_user=first)
+        following = UserFollowing.objects.create(
+            user=third, following_user=first)
+        UserFollowing.objects.create(user=first, following_user=third)
+        self.assertEqual(self.get_counts(first), (2, 1))
+        following.delete()
+        self.assertEqual(self.get_counts(first), (1, 1))
+        self.assertEqual(self.get_counts(third), (1, 0))
+        second.delete()
+        self.assertEqual(self.get_counts(first), (0, 1))
+
+    def get_account_deletion_queries(self, size):
+        user = User.objects.create(username=f'leaving{size}')
+        for index in range(size):
+            other = User.objects.create(username=f'other{size}-{index}')
+            UserFollowing.objects.create(user=user, following_user=other)
+            UserFollowing.objects.create(user=other, following_user=user)
+        with CaptureQueriesContext(connection) as queries:
+            with self.captureOnCommitCallbacks(execute=True):
+                user.delete()
+        return len(queries)
+
+    def test_account_deletion_does_not_grow_with_followings(self):
+        self.assertEqual(self.get_account_deletion_queries(1),
+                         self.get_account_deletion_queries(5))
+        self.assertEqual(set(Profile.objects.filter(
+            user__username__startswith='other').values_list(
+            'followers_count', 'following_count')), {(0, 0)})
+
+    def test_account_deletion_is_applied_to_the_graph(self):
+        first, second, third = self.users
+        UserFollowing.objects.create(user=first, following_user=second)
+        UserFollowing.objects.create(user=second, following_user=third)
+        UserFollowing.objects.create(user=first, following_user=third)
+        follow_graph = load_follow_graph()
+        self.addCleanup(reset_follow_graph)
+        second_pk = second.pk
+        with self.captureOnCommitCallbacks(execute=True):
+            second.delete()
+        self.assertFalse(follow_graph.is_following(first.pk, second_pk))
+        self.assertEqual(follow_graph.get_following(first.pk), [third.pk])
+        self.assertEqual(follow_graph.get_followers(third.pk), [first.pk])
+
+    def test_reconcile_repairs_drift(self):
+        first, second, _ = self.users
+        UserFollowing.objects.create(user=second, following_user=first)
+        Profile.objects.filter(user=first).update(followers_count=7)
+        Profile.objects.filter(user=second).update(following_count=0)
+        self.assertEqual(reconcile_follow_counts(dry_run=True), 2)
+        self.assertEqual(self.get_counts(first), (7, 0))
+        self.assertEqual(reconcile_follow_counts(), 2)
+        self.assertEqual(self.get_counts(first), (1, 0))
+        self.assertEqual(self.get_counts(second), (0, 1))
+        self.assertEqual(reconcile_follow_counts(), 0)
+
+
+class FollowSuggestionsTest(APITestCase):
+
+    def setUp(self):
+        users = {name: User.objects.create(username=name)
+                 for name in ('ann', 'bob', 'carl', 'dave', 'eve')}
+        for user, following_user in (('ann', 'bob'), ('bob', 'carl'),
+                                     ('bob', 'dave'), ('eve', 'ann'),
+                                     ('eve', 'dave')):
+            UserFollowing.objects.create(user=users[user],
+                                         following_user=users[following_user])
+        self.users = users
+
+    def get_suggestions(self, username):
+        response = self.client.get(f'/api/users/{username}/suggestions/')
+        self.assertEqual(response.status_code, 200)
+        return [(suggestion['username'], suggestion['score'])
+                for suggestion in response.data['results']]
+
+    def test_suggestions_rank_friends_of_friends_and_co_followers(self):
+        call_command('compute_follow_suggestions', chunk_size=2,
+                     stdout=StringIO())
+        self.assertEqual(self.get_suggestions('ann'),
+                         [('dave', 3), ('carl', 2)])
+        self.assertEqual(self.get_suggestions('carl'), [('dave', 1)])
+        UserFollowing.objects.create(user=self.users['ann'],
+                                     following_user=self.users['carl'])
+        self.assertEqual(self.get_suggestions('ann'), [('dave', 3)])
+
+    def test_recomputing_replaces_suggestions(self):
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        UserFollowing.objects.filter(user=self.users['bob']).delete()
+        call_command('compute_follow_suggestions', stdout=StringIO())
+        self.assertEqual(self.get_suggestions('ann'), [('dave', 1)])
+
+    def test_second_hop_edges_are_capped(self):
+        for name in ('fay', 'gus'):
+            UserFollowing.objects.create(
+                user=self.users['bob'],
+                following_user=User.objects.create(username=name))
+        user_id = self.users['ann'].pk
+        self.assertEqual(compute_suggestions([user_id], 10)[0], 2 + 2 + 4)
+        with mock.patch('users.suggestions.MAX_NEIGHBORS', 2):
+            with CaptureQueriesContext(connection) as queries:
+                edges, suggestions = compute_suggestions([user_id], 10)
+        self.assertEqual(edges, 2 + 2 + 2)
+        self.assertTrue(all('ROW_NUMBER()' in query['sql']
+                            for query in queries))
+        self.assertLessEqual(len(suggestions[user_id]), 3)
+
+
+class FollowGraphTest(APITestCase):
+
+    def setUp(self):
+        reset_follow_graph()
+        self.users = {name: User.objects.create(username=name)
+                      for name in ('ann', 'bob', 'carl', 'dave')}
+        for user, following_user in (('ann', 'bob'), ('ann', 'carl'),
+                                     ('bob', 'dave'), ('carl', 'dave'),
+                                     ('carl', 'ann')):
+            self.follow(user, following_user)
+
+    def tearDown(self):
+        reset_follow_graph()
+
+    def follow(self, user, following_user):
+        with self.captureOnCommitCallbacks(execute=True):
+            return UserFollowing.objects.create(
+                user=self.users[user], following_user=self.users[following_user])
+
+    def get_mutuals(self, username, other_username):
+        response = self.client.get(
+            f'/api/users/{username}/mutuals/{other_username}/')
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_mutuals(self):
+        load_follow_graph()
+        mutuals = self.get_mutuals('ann', 'dave')
+        self.assertEqual(mutuals['followed_by'], ['bob', 'carl'])
+        self.assertEqual(mutuals['followed_by_count'], 2)
+        self.assertEqual(self.get_mutuals('bob', 'carl')['common_followers'],
+                         ['ann'])
+        self.assertEqual(self.client.get(
+            '/api/users/ann/mutuals/nobody/').status_code, 404)
+
+    def test_graph_follows_new_and_deleted_followings(self):
+        load_follow_graph()
+        following = self.follow('dave', 'ann')
+        self.assertEqual(self.get_mutuals('bob', 'carl')['common_followers'],
+                         ['ann'])
+        self.assertEqual(self.get_mutuals('ann', 'carl')['common_followers'],
+                         [])
+        self.follow('bob', 'carl')
+        self.assertEqual(self.get_mutuals('ann', 'carl')['followed_by'],
+                         ['bob'])
+        with self.captureOnCommitCallbacks(execute=True):
+            following.delete()
+            UserFollowing.objects.filter(user=self.users['ann'],
+                                         following_user=self.users['carl']).get().delete()
+        self.assertEqual(self.get_mutuals('ann', 'dave')['followed_by'],
+                         ['bob'])
+        self.assertFalse(get_follow_graph().is_following(
+            self.users['dave'].pk, self.users['ann'].pk))
+
+    def test_users_list_reports_follow_status_in_one_query(self):
+        self.client.force_authenticate(self.users['ann'])
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/users/')
+        statuses = {user['username']: (user['is_following'], user['follows_you'])
+                    for user in response.data['results']}
+        self.assertEqual(statuses, {'ann': (False, False), 'bob': (True, False),
+                                    'carl': (True, True), 'dave': (False, False)})
+
+    def test_follow_status_does_not_wait_for_the_graph(self):
+        load_follow_graph()
+        UserFollowing.objects.create(user=self.users['dave'],
+                                     following_user=self.users['ann'])
+        self.client.force_authenticate(self.users['ann'])
+        response = self.client.get('/api/users/dave/')
+        self.assertTrue(response.data['follows_you'])
+
+    def test_mutuals_are_read_from_the_database_until_the_graph_loads(self):
+        with mock.patch('users.graph.warm_follow_graph') as warm:
+            self.assertEqual(self.get_mutuals('ann', 'dave')['followed_by'],
+                             ['bob', 'carl'])
+            self.assertEqual(
+                self.get_mutuals('bob', 'carl')['common_followers'], ['ann'])
+        self.assertEqual(warm.call_count, 2)
+
+    def test_stale_graph_is_reloaded_in_the_background(self):
+        stale = load_follow_graph()
+        stale.built -= GRAPH_TIMEOUT + 1
+        with mock.patch('users.graph.refresh_follow_graph',
+                        side_effect=graph._refresh_lock.release) as refresh:
+            with self.assertNumQueries(0):
+                self.assertIs(get_follow_graph(), stale)
+            with graph._refresh_lock:
+                refresh.assert_called_once_with()
+
+    def test_followings_made_during_a_reload_are_kept(self):
+        load_follow_graph()
+        load = FollowGraph.load
+
+        def load_and_follow():
+            loaded = load()
+            self.follow('dave', 'bob')
+            return loaded
+
+        with mock.patch.object(FollowGraph, 'load', load_and_follow):
+            load_follow_graph()
+        self.assertTrue(get_follow_graph().is_following(
+            self.users['dave'].pk, self.users['bob'].pk))
+
+
+class SignupTest(APITestCase):
+
+    def test_signup_is_a_single_pass(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/users/', {
+                'username': 'new', 'password': 'secret',
+                'profile': {'description': 'hello'}}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['profile'], {'description': 'hello'})
+        writes = [query['sql'] for query in queries
+                  if query['sql'].startswith(('INSERT', 'UPDATE'))]
+        self.assertEqual(len(writes), 2)
+        user = User.objects.get(username='new')
+        self.assertTrue(user.check_password('secret'))
+        self.assertEqual(user.profile.description, 'hello')
+
+    def test_bulk_import(self):
+        User.objects.create(username='taken')
+        records = [
+            {'username': 'hashed', 'password': make_password('secret')},
+            {'username': 'raw', 'raw_password': 'secret',
+             'description': 'imported'},
+            {'username': 'unusable'},
+            {'username': 'taken'},
+        ]
+        path = os.path.join(self.make_temporary_directory(), 'users.jsonl')
+        with open(path, 'w') as users_file:
+            users_file.write('\n'.join(map(json.dumps, records)))
+        call_command('import_users', path, stdout=StringIO())
+        users = {user.username: user for user in
+                 User.objects.select_related('profile')}
+        self.assertTrue(users['hashed'].check_password('secret'))
+        self.assertTrue(users['raw'].check_password('secret'))
+        self.assertFalse(users['unusable'].has_usable_password())
+        self.assertEqual(users['raw'].profile.description, 'imported')
+        self.assertEqual(Profile.objects.count(), 4)
+
+    def test_bulk_import_rejects_plaintext_passwords(self):
+        path = os.path.join(self.make_temporary_directory(), 'users.jsonl')
+        with open(path, 'w') as users_file:
+            users_file.write(json.dumps(
+                {'username': 'plain', 'password': 'secret'}))
+        with self.assertRaisesMessage(CommandError, 'Line 1: password'):
+            call_command('import_users', path, stdout=StringIO())
+        self.assertFalse(User.objects.filter(username='plain').exists())
+        with self.assertRaises(ValueError):
+            bulk_create_users([{'username': 'plain', 'password': 'secret'}])
+
+    def test_bulk_create_requires_usernames(self):
+        with self.assertRaisesMessage(ValueError, 'username is required'):
+            bulk_create_users([{'username': 'named'}, {'email': 'a@b.c'}])
+        self.assertFalse(User.objects.exists())
+
+    def test_users_saved_directly_still_get_a_profile(self):
+        user = User.objects.create(username='direct')
+        self.assertTrue(Profile.objects.filter(user=user).exists())
+
+    def make_temporary_directory(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name